@@ -19,3 +19,8 @@ admin.site.register(Maintenance)
 admin.site.register(ExpiredProduct)
 admin.site.register(StockHistory)
 admin.site.register(Tender)
+admin.site.register(StockForecast)
+admin.site.register(GeocodeCache)
+admin.site.register(ImportJob)
+admin.site.register(ChangeLog)
+admin.site.register(InventoryCounter)
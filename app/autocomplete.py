@@ -0,0 +1,221 @@
+import bisect
+import logging
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.db.models import Max
+
+from .changes import table_label
+from .models import Asset, ChangeLog
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+# Longer names and barcodes are indexed by their first characters only
+MAX_KEY_LENGTH = 64
+# Catching up on more log entries than this rebuilds the index instead
+MAX_CATCH_UP = 5000
+
+
+def normalize(text):
+    return (text or '').strip().lower()[:MAX_KEY_LENGTH]
+
+
+def index_keys(barcode, asset_name):
+    """
+    Keys an asset is found under: its barcode and name, and the later words
+    of the name, indexed only while there is room, so that 'lat' also finds
+    'Dell Latitude'.
+    """
+    name = normalize(asset_name)
+    primary = [key for key in dict.fromkeys([normalize(barcode), name]) if key]
+    extra = [word for word in dict.fromkeys(name.split()[1:]) if word not in primary]
+    return primary, extra
+
+
+class PrefixIndex:
+    """
+    Sorted array of lowercased keys with a parallel array of asset ids.
+    Prefix lookups are a binary search followed by a short scan. At most
+    `max_entries` keys are held: once full, name words are dropped first and
+    then further assets are left out entirely, so memory stays bounded.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.keys = []
+        self.ids = array('q')
+        self.assets = {}  # asset_id -> (barcode, asset_name)
+        self.lock = threading.Lock()
+        self.cursor = 0  # last ChangeLog id applied
+        self.checked_at = 0.0
+
+    def load(self, rows):
+        """Fill the index from (asset_id, barcode, asset_name) rows, sorting once."""
+        entries = []
+        extras = []
+        skipped = 0
+        for asset_id, barcode, asset_name in rows:
+            primary, extra = index_keys(barcode, asset_name)
+            if len(entries) + len(primary) > self.max_entries:
+                skipped += 1
+                continue
+            self.assets[asset_id] = (barcode or '', asset_name or '')
+            entries.extend((key, asset_id) for key in primary)
+            extras.extend((key, asset_id) for key in extra)
+        if skipped:
+            logger.warning("Autocomplete index full: %d assets not indexed", skipped)
+        room = self.max_entries - len(entries)
+        if len(extras) > room:
+            logger.warning("Autocomplete index full: %d name words not indexed", len(extras) - room)
+        entries.extend(extras[:room])
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = array('q', (asset_id for _, asset_id in entries))
+
+    def _insert(self, key, asset_id):
+        position = bisect.bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.ids.insert(position, asset_id)
+
+    def _remove(self, key, asset_id):
+        position = bisect.bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.ids[position] == asset_id:
+                del self.keys[position]
+                del self.ids[position]
+                return
+            position += 1
+
+    def _discard(self, asset_id):
+        old = self.assets.pop(asset_id, None)
+        if old is not None:
+            primary, extra = index_keys(*old)
+            for key in primary + extra:
+                self._remove(key, asset_id)
+
+    def add(self, asset_id, barcode, asset_name):
+        with self.lock:
+            self._discard(asset_id)
+            primary, extra = index_keys(barcode, asset_name)
+            if len(self.keys) + len(primary) > self.max_entries:
+                logger.warning("Autocomplete index full: asset %s not indexed", asset_id)
+                return
+            self.assets[asset_id] = (barcode or '', asset_name or '')
+            for key in primary:
+                self._insert(key, asset_id)
+            for key in extra:
+                if len(self.keys) >= self.max_entries:
+                    break
+                self._insert(key, asset_id)
+
+    def discard(self, asset_id):
+        with self.lock:
+            self._discard(asset_id)
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Up to `limit` assets with a key starting with `prefix`, in key order."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self.lock:
+            position = bisect.bisect_left(self.keys, prefix)
+            while (position < len(self.keys) and len(results) < limit
+                   and self.keys[position].startswith(prefix)):
+                asset_id = self.ids[position]
+                if asset_id not in seen:
+                    seen.add(asset_id)
+                    barcode, asset_name = self.assets[asset_id]
+                    results.append({'asset_id': asset_id, 'barcode': barcode, 'asset_name': asset_name})
+                position += 1
+        return results
+
+    def __len__(self):
+        return len(self.keys)
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def build_index():
+    # Read the log position first: changes made while the rows load are
+    # applied again on the next catch-up, which is harmless.
+    cursor = ChangeLog.objects.aggregate(last=Max('id'))['last'] or 0
+    index = PrefixIndex(settings.AUTOCOMPLETE_MAX_ENTRIES)
+    index.load(Asset.objects.values_list('asset_id', 'barcode', 'asset_name').iterator(chunk_size=5000))
+    index.cursor = cursor
+    index.checked_at = time.monotonic()
+    return index
+
+
+def catch_up(index):
+    """
+    Apply asset changes logged since the index was built or last caught up.
+    This picks up writes from other processes and bulk writes, which send
+    no signals. Returns False when there is too much to apply one by one.
+    """
+    entries = list(ChangeLog.objects.filter(id__gt=index.cursor).order_by(
+        'id').values_list('id', 'table', 'object_id')[:MAX_CATCH_UP + 1])
+    if len(entries) > MAX_CATCH_UP:
+        return False
+    asset_ids = {object_id for _, table, object_id in entries if table == table_label(Asset)}
+    if asset_ids:
+        rows = Asset.objects.filter(pk__in=asset_ids).values_list('asset_id', 'barcode', 'asset_name')
+        for asset_id, barcode, asset_name in rows:
+            asset_ids.discard(asset_id)
+            index.add(asset_id, barcode, asset_name)
+        for asset_id in asset_ids:
+            index.discard(asset_id)
+    if entries:
+        index.cursor = entries[-1][0]
+    return True
+
+
+def get_index():
+    """The process-wide index, built on first use and refreshed from the change log."""
+    global _index
+    with _build_lock:
+        if _index is None:
+            _index = build_index()
+        elif time.monotonic() - _index.checked_at >= settings.AUTOCOMPLETE_REFRESH_SECONDS:
+            if not catch_up(_index):
+                _index = build_index()
+            _index.checked_at = time.monotonic()
+        return _index
+
+
+def autocomplete(prefix, limit=AUTOCOMPLETE_LIMIT):
+    return get_index().search(prefix, min(limit, MAX_AUTOCOMPLETE_LIMIT))
+
+
+def asset_saved(asset_id, barcode, asset_name):
+    # Only keep an index this process has already built up to date
+    if _index is not None:
+        _index.add(asset_id, barcode, asset_name)
+
+
+def asset_deleted(asset_id):
+    if _index is not None:
+        _index.discard(asset_id)
+
+
+def reset_index():
+    global _index
+    with _build_lock:
+        _index = None
+
+
+def warm_index():
+    """Build the index in a background thread, so the first keystroke is fast."""
+    def build():
+        try:
+            get_index()
+        except Exception:
+            logger.exception("Could not build the autocomplete index")
+    threading.Thread(target=build, name='autocomplete-warmup', daemon=True).start()
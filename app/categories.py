@@ -0,0 +1,68 @@
+import threading
+
+from django.core.cache import cache
+
+from .changes import table_versions
+from .models import AssetCategory, AssetSubCategory
+from .serializers import SubcategorySerializer
+
+CATEGORY_TREE_TIMEOUT = 24 * 60 * 60
+
+# Trees built by this process, by table versions. Writes in other processes
+# bump the versions, so a stale entry is never served.
+_local = {}
+_lock = threading.Lock()
+
+
+def build_category_tree():
+    """
+    Load all categories and subcategories in two queries. Returns the
+    category -> subcategory tree served by /api/categories/ and the full
+    subcategory list, including subcategories without a category.
+    """
+    subcategories = SubcategorySerializer(
+        AssetSubCategory.objects.order_by('sub_category_id'), many=True).data
+    children = {}
+    for sub in subcategories:
+        children.setdefault(sub['category'], []).append({
+            'sub_category_id': sub['sub_category_id'],
+            'sub_category_name': sub['sub_category_name'],
+        })
+    tree = [
+        {**category, 'subcategories': children.get(category['category_id'], [])}
+        for category in AssetCategory.objects.order_by('category_id').values(
+            'category_id', 'category_name')
+    ]
+    return {'tree': tree, 'subcategories': [dict(sub) for sub in subcategories]}
+
+
+def _cached_categories():
+    versions = table_versions(AssetCategory, AssetSubCategory)
+    key = 'category-tree:' + ':'.join(str(version) for version in versions.values())
+    data = _local.get(key)
+    if data is None:
+        data = cache.get(key)
+        if data is None:
+            data = build_category_tree()
+            cache.set(key, data, CATEGORY_TREE_TIMEOUT)
+        with _lock:
+            _local.clear()
+            _local[key] = data
+    return data
+
+
+def invalidate_category_tree():
+    with _lock:
+        _local.clear()
+
+
+def get_category_tree():
+    return _cached_categories()['tree']
+
+
+def get_subcategories(category_id=None):
+    """All subcategories, or those of one category, as serialized dicts."""
+    subcategories = _cached_categories()['subcategories']
+    if category_id is None:
+        return subcategories
+    return [sub for sub in subcategories if sub['category'] == category_id]
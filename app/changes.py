@@ -0,0 +1,115 @@
+import hashlib
+from collections import defaultdict
+
+from django.db.models import F
+
+from .models import (Allocation, Asset, AssetCategory, AssetSubCategory, ChangeLog, RequestAsset,
+                     TableVersion)
+from .serializers import (AllocationSerializer, AssetCategorySerializer, AssetSerializer,
+                          RequestAssetSerializer, SubcategorySerializer)
+
+SYNC_PAGE_SIZE = 1000
+
+# Models mirrored by offline clients through /api/sync/, with the response
+# key and serializer used for each
+SYNC_TABLES = [
+    ('assets', Asset, AssetSerializer),
+    ('allocations', Allocation, AllocationSerializer),
+    ('requests', RequestAsset, RequestAssetSerializer),
+    ('categories', AssetCategory, AssetCategorySerializer),
+    ('subcategories', AssetSubCategory, SubcategorySerializer),
+]
+SYNC_MODELS = [model for _, model, _ in SYNC_TABLES]
+
+
+def table_label(model):
+    """The name a model's table goes by in TableVersion and ChangeLog rows."""
+    return model._meta.label_lower
+
+
+def bump_version(*models):
+    """
+    Increment the version counter of each model's table. Called by the
+    post_save/post_delete signals and by bulk writes, which send no signals.
+    """
+    for model in models:
+        label = table_label(model)
+        if not TableVersion.objects.filter(table=label).update(version=F('version') + 1):
+            # First write to the table: a concurrent bump may create the row too
+            TableVersion.objects.bulk_create(
+                [TableVersion(table=label, version=0)], ignore_conflicts=True)
+            TableVersion.objects.filter(table=label).update(version=F('version') + 1)
+
+
+def table_versions(*models):
+    """Return {label: version} for the models' tables in one query."""
+    labels = [table_label(model) for model in models]
+    versions = dict(TableVersion.objects.filter(
+        table__in=labels).values_list('table', 'version'))
+    return {label: versions.get(label, 0) for label in labels}
+
+
+def versioned_etag(*models):
+    """
+    Build an etag_func for django.views.decorators.http.condition() from the
+    version counters of the tables a view reads. The full path and the Accept
+    header are part of the tag, since they change the response body.
+    """
+    def etag(request, *args, **kwargs):
+        versions = table_versions(*models)
+        raw = '|'.join([
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            *(f"{label}:{version}" for label, version in versions.items()),
+        ])
+        return hashlib.sha1(raw.encode()).hexdigest()
+    return etag
+
+
+def log_changes(model, object_ids, action='upsert'):
+    """Append a ChangeLog entry per object id. Bulk writes call this directly."""
+    ChangeLog.objects.bulk_create([
+        ChangeLog(table=table_label(model), object_id=object_id, action=action)
+        for object_id in object_ids
+    ], batch_size=1000)
+
+
+def changes_since(cursor, limit=SYNC_PAGE_SIZE):
+    """
+    Collect what changed after `cursor` (a ChangeLog id): the current rows
+    of created or updated objects and the ids of deleted ones, per table.
+    Reads at most `limit` log entries, so the cost follows the amount of
+    change rather than the size of the tables.
+    """
+    entries = list(ChangeLog.objects.filter(id__gt=cursor).order_by(
+        'id').values_list('id', 'table', 'object_id', 'action')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Only the last action on an object matters
+    latest = defaultdict(dict)
+    for _, table, object_id, action in entries:
+        latest[table][object_id] = action
+
+    data = {
+        'cursor': entries[-1][0] if entries else cursor,
+        'has_more': has_more,
+    }
+    for key, model, serializer_class in SYNC_TABLES:
+        actions = latest.get(table_label(model), {})
+        upserted = [pk for pk, action in actions.items() if action == 'upsert']
+        rows = []
+        if upserted:
+            queryset = model.objects.filter(pk__in=upserted)
+            if hasattr(serializer_class, 'setup_eager_loading'):
+                queryset = serializer_class.setup_eager_loading(queryset)
+            rows = list(queryset)
+        found = {row.pk for row in rows}
+        # Objects logged as saved but gone by now were deleted later on
+        deleted = [pk for pk, action in actions.items()
+                   if action == 'delete' or pk not in found]
+        data[key] = {
+            'updated': serializer_class(rows, many=True).data,
+            'deleted': sorted(deleted),
+        }
+    return data
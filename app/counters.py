@@ -0,0 +1,122 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Asset, InventoryCounter
+
+# Asset columns the counters are derived from
+COUNTED_FIELDS = ['asset_status', 'condition', 'assign_to_id', 'asset_category_id']
+
+
+def counter_keys(asset_status, condition, assign_to_id, asset_category_id):
+    """The (dimension, key) counters one asset with these values adds 1 to."""
+    keys = [
+        ('total', ''),
+        ('status', asset_status or ''),
+        ('condition', condition or ''),
+        ('assigned', 'yes' if assign_to_id else 'no'),
+        ('subcategory', str(asset_category_id or '')),
+    ]
+    if assign_to_id:
+        keys.append(('user', str(assign_to_id)))
+    return keys
+
+
+def apply_deltas(deltas):
+    """Add each {(dimension, key): delta} to its counter, creating missing ones."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        for (dimension, key), delta in deltas.items():
+            counter = InventoryCounter.objects.filter(dimension=dimension, key=key)
+            if not counter.update(count=F('count') + delta):
+                InventoryCounter.objects.bulk_create(
+                    [InventoryCounter(dimension=dimension, key=key, count=0)],
+                    ignore_conflicts=True)
+                counter.update(count=F('count') + delta)
+
+
+def count_changes(old_values, new_values):
+    """
+    Deltas for assets moving from `old_values` to `new_values`, each a list
+    of COUNTED_FIELDS tuples. Use an empty list for created or deleted rows.
+    """
+    deltas = Counter()
+    for values in old_values:
+        deltas.subtract(counter_keys(*values))
+    for values in new_values:
+        deltas.update(counter_keys(*values))
+    return deltas
+
+
+def record_asset_change(old_values, new_values):
+    apply_deltas(count_changes(old_values, new_values))
+
+
+def move_assets(queryset, field, value):
+    """
+    Count the assets in `queryset` as if `field` were set to `value`, before
+    an UPDATE that bypasses Asset.save(), e.g. SET_NULL on delete.
+    """
+    old_values = list(queryset.values_list(*COUNTED_FIELDS))
+    index = COUNTED_FIELDS.index(field)
+    new_values = [values[:index] + (value,) + values[index + 1:] for values in old_values]
+    record_asset_change(old_values, new_values)
+
+
+def compute_counters():
+    """Recount every counter from the Asset table, as {(dimension, key): count}."""
+    counts = Counter()
+    groups = Asset.objects.values_list(*COUNTED_FIELDS).annotate(rows=Count('pk')).order_by()
+    for *values, rows in groups:
+        for key in counter_keys(*values):
+            counts[key] += rows
+    return counts
+
+
+def stored_counters():
+    return {(dimension, key): count for dimension, key, count
+            in InventoryCounter.objects.values_list('dimension', 'key', 'count')}
+
+
+def _drift(stored, actual):
+    return {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in stored.keys() | actual.keys()
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+
+
+def counter_drift():
+    """{(dimension, key): (stored, actual)} for every counter that is off."""
+    return _drift(stored_counters(), compute_counters())
+
+
+def rebuild_counters():
+    """Replace all counters with a fresh count. Returns the drift that was fixed."""
+    with transaction.atomic():
+        # Hold concurrent counter updates until the recount is written
+        list(InventoryCounter.objects.select_for_update().values_list('pk'))
+        actual = compute_counters()
+        drift = _drift(stored_counters(), actual)
+        InventoryCounter.objects.all().delete()
+        InventoryCounter.objects.bulk_create([
+            InventoryCounter(dimension=dimension, key=key, count=count)
+            for (dimension, key), count in actual.items() if count
+        ])
+    return drift
+
+
+def get_counters():
+    """All counters as {dimension: {key: count}}, read in one query."""
+    counters = {}
+    for (dimension, key), count in stored_counters().items():
+        counters.setdefault(dimension, {})[key] = count
+    return counters
+
+
+def get_counter(dimension, key):
+    return InventoryCounter.objects.filter(
+        dimension=dimension, key=key).values_list('count', flat=True).first() or 0
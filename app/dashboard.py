@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .changes import table_versions
+from .counters import get_counter, get_counters
+from .models import ASSET_STATUS_CHOICES, CONDITION_CHOICES, Asset, UserDetails
+
+
+def _breakdown(counts, choices):
+    # Every choice, at 0 when unused, plus any other value stored in the
+    # table (e.g. imported conditions such as 'New' or 'Used')
+    breakdown = {value: 0 for value, _ in choices}
+    breakdown.update({value: count for value, count in counts.items() if count})
+    return breakdown
+
+
+def _asset_stats(counters):
+    assigned = counters.get('assigned', {})
+    return {
+        'assets': counters.get('total', {}).get('', 0),
+        'available': assigned.get('no', 0),
+        'in_use': assigned.get('yes', 0),
+        'status': _breakdown(counters.get('status', {}), ASSET_STATUS_CHOICES),
+        'condition': _breakdown(counters.get('condition', {}), CONDITION_CHOICES),
+    }
+
+
+def _user_stats(counters):
+    # Assigned assets per station, summed from the per-user counters
+    per_user = counters.get('user', {})
+    stations = {}
+    users = 0
+    for user_id, station_name in UserDetails.objects.values_list('pk', 'station__station_name'):
+        users += 1
+        products = per_user.get(str(user_id), 0)
+        if products:
+            stations[station_name] = stations.get(station_name, 0) + products
+    return {'users': users, 'stations': list(stations.items())}
+
+
+def _cache_key(prefix):
+    versions = table_versions(Asset, UserDetails)
+    return prefix + ':' + ':'.join(str(version) for version in versions.values())
+
+
+def compute_dashboard_stats():
+    counters = get_counters()
+    return {**_asset_stats(counters), **_user_stats(counters)}
+
+
+def get_dashboard_stats():
+    """
+    Counters for the dashboard and the totals endpoints, read from the
+    InventoryCounter table and the user list, so the cost does not grow with
+    the number of assets. Results are cached per version of the Asset and
+    UserDetails tables, so any write to either is reflected on the next call.
+    """
+    key = _cache_key('dashboard')
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(key, stats, settings.DASHBOARD_CACHE_SECONDS)
+    return stats
+
+
+def get_user_asset_count(username):
+    """Number of assets assigned to `username`, cached like get_dashboard_stats()."""
+    key = _cache_key(f'dashboard:user:{username}')
+    count = cache.get(key)
+    if count is None:
+        user_id = UserDetails.objects.filter(
+            username=username).values_list('pk', flat=True).first()
+        count = get_counter('user', str(user_id)) if user_id else 0
+        cache.set(key, count, settings.DASHBOARD_CACHE_SECONDS)
+    return count
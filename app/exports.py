@@ -0,0 +1,109 @@
+import csv
+import tempfile
+
+from openpyxl import Workbook
+
+from .models import Allocation, Asset, Maintenance, StockHistory
+
+EXPORT_CHUNK_SIZE = 2000
+# Excel's row limit per worksheet, header included
+MAX_SHEET_ROWS = 1048576
+
+PRODUCT_EXPORT_HEADER = ['asset_name', 'barcode', 'category_name', 'sub_category_name',
+                         'purchase_date', 'asset_value', 'condition']
+
+
+class Echo:
+    """File-like object whose write() hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def product_rows():
+    # One joined query read in chunks: no per-row category lookups and no
+    # model instances.
+    return Asset.objects.order_by('asset_id').values_list(
+        'asset_name',
+        'barcode',
+        'asset_category__category__category_name',
+        'asset_category__sub_category_name',
+        'purchase_date',
+        'asset_value',
+        'condition',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_products_csv():
+    """Yield the product export as CSV lines, one at a time."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(PRODUCT_EXPORT_HEADER)
+    for name, barcode, category, sub_category, purchase_date, value, condition in product_rows():
+        yield writer.writerow([
+            name,
+            barcode,
+            category or '',
+            sub_category or '',
+            purchase_date.strftime('%Y-%m-%d') if purchase_date else '',
+            value,
+            condition,
+        ])
+
+
+INVENTORY_SHEETS = [
+    ('Assets', ['Asset ID', 'Asset Name', 'Barcode', 'Category', 'Subcategory', 'Purchase Date',
+                'Asset Value', 'Condition', 'Location', 'Status', 'Assigned To', 'Station',
+                'Maintenance Date'],
+     lambda: Asset.objects.order_by('asset_id').values_list(
+         'asset_id', 'asset_name', 'barcode', 'asset_category__category__category_name',
+         'asset_category__sub_category_name', 'purchase_date', 'asset_value', 'condition',
+         'location', 'asset_status', 'assign_to__username', 'assign_to__station__station_name',
+         'asset_maintenance_date')),
+    ('Allocations', ['Allocation ID', 'Barcode', 'Asset Name', 'User', 'Assign Date',
+                     'Expected Return Date', 'Return Date', 'Assign Location'],
+     lambda: Allocation.objects.order_by('allocation_id').values_list(
+         'allocation_id', 'asset__barcode', 'asset__asset_name', 'user__username', 'assign_date',
+         'expected_return_date', 'return_date', 'assign_location')),
+    ('Maintenance', ['Maintenance ID', 'Barcode', 'Asset Name', 'Last Maintenance',
+                     'Next Maintenance', 'Cost', 'Return Date'],
+     lambda: Maintenance.objects.order_by('maintenance_id').values_list(
+         'maintenance_id', 'asset__barcode', 'asset__asset_name', 'last_maintenance_date',
+         'next_maintenance_date', 'maintenance_cost', 'return_date')),
+    ('Stock History', ['Asset ID', 'Barcode', 'Date', 'Stock Level'],
+     lambda: StockHistory.objects.order_by('asset_id', 'date').values_list(
+         'asset_id', 'asset__barcode', 'date', 'stock_level')),
+]
+
+
+def _write_sheet(workbook, title, header, rows):
+    # Continue on "<title> (2)", "(3)"... once a sheet reaches Excel's limit
+    part = 1
+    sheet = workbook.create_sheet(title)
+    sheet.append(header)
+    written = 1
+    for row in rows:
+        if written == MAX_SHEET_ROWS:
+            part += 1
+            sheet = workbook.create_sheet(f"{title} ({part})")
+            sheet.append(header)
+            written = 1
+        sheet.append(row)
+        written += 1
+
+
+def write_inventory_workbook():
+    """
+    Write assets, allocations, maintenance and stock history to a
+    multi-sheet XLSX and return it as an open temporary file. Rows are read
+    with chunked iterators and openpyxl's write-only mode streams them to
+    disk, so memory stays bounded for any number of rows.
+    """
+    workbook = Workbook(write_only=True)
+    for title, header, queryset in INVENTORY_SHEETS:
+        _write_sheet(workbook, title, header,
+                     queryset().iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+    spool = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(spool)
+    spool.seek(0)
+    return spool
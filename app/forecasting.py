@@ -0,0 +1,235 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+from statsmodels.tsa.arima.model import ARIMA
+
+from .models import StockForecast, StockHistory
+
+ARIMA_ORDER = (2, 1, 2)
+FORECAST_DAYS = 30
+MIN_HISTORY_ROWS = 10
+SAVE_BATCH_ASSETS = 200
+
+
+def model_version(order=ARIMA_ORDER):
+    return "arima-" + ".".join(str(part) for part in order)
+
+
+class ForecastError(Exception):
+    """Raised when an asset's stock history cannot be forecast."""
+
+
+def _cache():
+    return caches[settings.FORECAST_CACHE_ALIAS]
+
+
+def _cache_key(asset_id):
+    return f"forecast:{asset_id}"
+
+
+def make_fingerprint(rows, first_date, last_date, total):
+    # Row count, date range and the sum of stock levels change whenever a
+    # row is added, removed or edited, so they identify a history snapshot.
+    raw = f"{rows}:{first_date}:{last_date}:{total}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def history_fingerprint(asset_id):
+    """Return (row_count, fingerprint) for an asset's stock history in one query."""
+    stats = StockHistory.objects.filter(asset_id=asset_id).aggregate(
+        rows=Count('id'), first=Min('date'), last=Max('date'), total=Sum('stock_level'))
+    if not stats['rows']:
+        return 0, None
+    return stats['rows'], make_fingerprint(
+        stats['rows'], stats['first'], stats['last'], stats['total'])
+
+
+def series_fingerprint(history):
+    return make_fingerprint(
+        len(history), history.index[0].date(), history.index[-1].date(), int(history.sum()))
+
+
+def load_history(asset_id):
+    """Load an asset's stock history as a date-indexed series of stock levels."""
+    rows = StockHistory.objects.filter(
+        asset_id=asset_id).order_by('date').values_list('date', 'stock_level')
+    df = pd.DataFrame.from_records(list(rows), columns=['date', 'stock_level'])
+    df['date'] = pd.to_datetime(df['date'])
+    return df.set_index('date')['stock_level']
+
+
+def check_history_length(rows):
+    if rows == 0:
+        raise ForecastError("No stock history available")
+    if rows < MIN_HISTORY_ROWS:
+        raise ForecastError("Not enough stock history for prediction")
+
+
+def fit_forecast(history, order=ARIMA_ORDER, steps=FORECAST_DAYS):
+    """Fit ARIMA on the history and return [(date, predicted_level), ...]."""
+    # Fit on the raw values: forecast dates are derived below, so gaps in the
+    # history's date index must not stop statsmodels from forecasting.
+    model_fit = ARIMA(history.to_numpy(dtype=float), order=order).fit()
+    forecast = model_fit.forecast(steps=steps)
+    last_date = history.index[-1].date()
+    return [(last_date + timedelta(days=i), int(np.round(value)))
+            for i, value in enumerate(forecast, start=1)]
+
+
+def stored_forecast(asset_id, fingerprint, order=ARIMA_ORDER, steps=FORECAST_DAYS):
+    """
+    Return the precomputed forecast for an asset if it is recent and was
+    fitted on the history identified by `fingerprint`, or None. The
+    fingerprint check catches history written without signals, e.g. by
+    bulk_create.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.FORECAST_MAX_AGE_HOURS)
+    rows = list(StockForecast.objects.filter(
+        asset_id=asset_id, model_version=model_version(order), generated_at__gte=cutoff,
+    ).order_by('forecast_date').values_list(
+        'forecast_date', 'stock_level', 'history_fingerprint')[:steps])
+    if len(rows) < steps or any(row[2] != fingerprint for row in rows):
+        return None
+    return [(date, stock) for date, stock, _ in rows]
+
+
+def get_forecast(asset_id, order=ARIMA_ORDER, steps=FORECAST_DAYS, history=None):
+    """
+    Return the forecast for an asset. Fresh rows in StockForecast fitted on
+    the current history are served as is; otherwise the cached fit is reused
+    while the stock history is unchanged, and only then is the model refitted. Pass `history` when it is
+    already loaded to skip the fingerprint query.
+    """
+    if history is None:
+        rows, fingerprint = history_fingerprint(asset_id)
+    else:
+        rows = len(history)
+        fingerprint = series_fingerprint(history) if rows else None
+    check_history_length(rows)
+
+    forecast = stored_forecast(asset_id, fingerprint, order=order, steps=steps)
+    if forecast is not None:
+        return forecast
+
+    key = _cache_key(asset_id)
+    entry = _cache().get(key) or {}
+    cached = entry.get((tuple(order), steps))
+    if cached and cached['fingerprint'] == fingerprint:
+        forecast = cached['forecast']
+    else:
+        if history is None:
+            history = load_history(asset_id)
+        forecast = fit_forecast(history, order=order, steps=steps)
+        entry[(tuple(order), steps)] = {
+            'fingerprint': fingerprint, 'forecast': forecast}
+        _cache().set(key, entry)
+
+    # Store the result so the next request is a single indexed lookup
+    if (tuple(order), steps) == (ARIMA_ORDER, FORECAST_DAYS):
+        save_forecasts({asset_id: forecast}, {asset_id: fingerprint}, order=order)
+    return forecast
+
+
+def invalidate_forecast(asset_id):
+    _cache().delete(_cache_key(asset_id))
+    StockForecast.objects.filter(asset_id=asset_id).delete()
+
+
+def load_all_histories(asset_ids=None):
+    """Load stock history for many assets in one query, as {asset_id: series}."""
+    rows = StockHistory.objects.order_by('asset_id', 'date')
+    if asset_ids:
+        rows = rows.filter(asset_id__in=asset_ids)
+    rows = rows.values_list('asset_id', 'date', 'stock_level').iterator(chunk_size=5000)
+
+    histories = {}
+    for asset_id, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        histories[asset_id] = pd.Series(
+            [row[2] for row in group],
+            index=pd.to_datetime([row[1] for row in group]))
+    return histories
+
+
+def _forecast_worker(asset_id, history, order, steps):
+    # Runs in a pool process: report failures instead of raising so a single
+    # bad series never aborts the batch.
+    try:
+        check_history_length(len(history))
+        return asset_id, fit_forecast(history, order=order, steps=steps), None
+    except Exception as e:
+        return asset_id, None, str(e)
+
+
+def save_forecasts(forecasts, fingerprints, order=ARIMA_ORDER, generated_at=None):
+    """
+    Replace the stored forecast rows for each asset in `forecasts`, recording
+    the fingerprint of the history each one was fitted on.
+    """
+    generated_at = generated_at or timezone.now()
+    version = model_version(order)
+    with transaction.atomic():
+        StockForecast.objects.filter(asset_id__in=forecasts.keys()).delete()
+        StockForecast.objects.bulk_create([
+            StockForecast(asset_id=asset_id, forecast_date=date, stock_level=stock,
+                          model_version=version, generated_at=generated_at,
+                          history_fingerprint=fingerprints[asset_id])
+            for asset_id, forecast in forecasts.items()
+            for date, stock in forecast
+        ], batch_size=1000)
+
+
+def run_batch_forecast(asset_ids=None, workers=None, order=ARIMA_ORDER, steps=FORECAST_DAYS):
+    """
+    Fit forecasts for every asset with stock history across a process pool
+    and store them in StockForecast. Returns a summary with per-asset
+    failures and throughput.
+    """
+    started = time.monotonic()
+    histories = load_all_histories(asset_ids)
+    fingerprints = {asset_id: series_fingerprint(history) for asset_id, history in histories.items()}
+    workers = workers or os.cpu_count() or 1
+
+    # Pool processes only do model fitting; don't let them inherit open
+    # database connections from the parent.
+    connections.close_all()
+
+    succeeded = 0
+    failures = {}
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_forecast_worker, asset_id, history, order, steps)
+                   for asset_id, history in histories.items()]
+        for future in as_completed(futures):
+            asset_id, forecast, error = future.result()
+            if error:
+                failures[asset_id] = error
+                continue
+            pending[asset_id] = forecast
+            if len(pending) >= SAVE_BATCH_ASSETS:
+                save_forecasts(pending, fingerprints, order=order)
+                succeeded += len(pending)
+                pending = {}
+    if pending:
+        save_forecasts(pending, fingerprints, order=order)
+        succeeded += len(pending)
+
+    elapsed = time.monotonic() - started
+    return {
+        'assets': len(histories),
+        'succeeded': succeeded,
+        'failures': failures,
+        'elapsed': elapsed,
+        'assets_per_second': len(histories) / elapsed if elapsed else 0.0,
+    }
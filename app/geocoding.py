@@ -0,0 +1,246 @@
+import csv
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from functools import cache
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_FIELDS = ('road', 'state_district', 'city_district')
+EARTH_RADIUS_KM = 6371.0088
+
+
+class GeocoderError(Exception):
+    """Raised when no backend can resolve a coordinate to an address."""
+
+
+def _unit_vectors(latitudes, longitudes):
+    # Points on the unit sphere, so euclidean nearest neighbours in the
+    # KD-tree are also the nearest places by great-circle distance.
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class GazetteerGeocoder:
+    """
+    Offline reverse geocoder over a local CSV gazetteer.
+
+    The CSV needs `lat` and `lon` columns plus any of `road`,
+    `state_district` and `city_district`. Places are held in a KD-tree and
+    the nearest one within `max_distance_km` is returned.
+    """
+
+    def __init__(self, path, max_distance_km=2.0):
+        from scipy.spatial import cKDTree
+
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        if not rows:
+            raise ValueError(f"Gazetteer {path} has no places")
+
+        self.addresses = [
+            {field: row.get(field) or None for field in ADDRESS_FIELDS} for row in rows]
+        self.tree = cKDTree(_unit_vectors(
+            [row['lat'] for row in rows], [row['lon'] for row in rows]))
+        # Chord length on the unit sphere matching the distance limit
+        self.max_chord = 2 * math.sin(max_distance_km / EARTH_RADIUS_KM / 2)
+
+    def reverse(self, latitude, longitude):
+        distance, index = self.tree.query(
+            _unit_vectors([latitude], [longitude])[0], distance_upper_bound=self.max_chord)
+        if math.isinf(distance):
+            return None
+        return dict(self.addresses[index])
+
+
+class NominatimGeocoder:
+    """Online reverse geocoding through OpenStreetMap Nominatim (geopy)."""
+
+    def __init__(self, user_agent="asset_management", timeout=5):
+        from geopy.geocoders import Nominatim
+
+        self.geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def reverse(self, latitude, longitude):
+        location = self.geolocator.reverse((latitude, longitude))
+        if location is None:
+            return None
+        return location.raw['address']
+
+
+class StaticGeocoder:
+    """
+    Stand-in backend that answers from fixed data without any I/O, for tests
+    and local development. `addresses` maps "lat,lon" strings to addresses;
+    any other coordinate gets `default`.
+    """
+
+    def __init__(self, addresses=None, default=None):
+        self.addresses = addresses or {}
+        self.default = default
+
+    def reverse(self, latitude, longitude):
+        return self.addresses.get(f"{latitude},{longitude}", self.default)
+
+
+class ChainGeocoder:
+    """Ask each backend in turn and return the first address found."""
+
+    def __init__(self, backends):
+        self.backends = backends
+
+    def reverse(self, latitude, longitude):
+        for backend in self.backends:
+            try:
+                address = backend.reverse(latitude, longitude)
+            except Exception:
+                logger.exception("%s failed to reverse geocode (%s, %s)",
+                                 type(backend).__name__, latitude, longitude)
+                continue
+            if address:
+                return address
+        raise GeocoderError(f"No address found for ({latitude}, {longitude})")
+
+
+class CachedGeocoder:
+    """
+    Cache in front of another geocoder. Coordinates are rounded to
+    `precision` decimal places (4 places is roughly 11 m) and looked up in a
+    bounded in-process LRU, then in the GeocodeCache table, which survives
+    restarts and is shared by all workers.
+    """
+
+    def __init__(self, geocoder, precision=4, max_entries=10000):
+        self.geocoder = geocoder
+        self.precision = precision
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def quantize(self, latitude, longitude):
+        return f"{latitude:.{self.precision}f},{longitude:.{self.precision}f}"
+
+    def _remember(self, key, address):
+        with self.lock:
+            self.entries[key] = address
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def reverse(self, latitude, longitude):
+        from .models import GeocodeCache
+
+        key = self.quantize(latitude, longitude)
+        with self.lock:
+            address = self.entries.get(key)
+            if address is not None:
+                self.entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return address
+
+        address = GeocodeCache.objects.filter(
+            key=key).values_list('address', flat=True).first()
+        if address is not None:
+            self._count('db_hits')
+        else:
+            self._count('misses')
+            address = self.geocoder.reverse(latitude, longitude)
+            # Another worker may have stored the same cell in the meantime
+            GeocodeCache.objects.bulk_create(
+                [GeocodeCache(key=key, address=address)], ignore_conflicts=True)
+        self._remember(key, address)
+        return address
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def load_backend(config):
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@cache
+def get_geocoder():
+    backends = []
+    for config in settings.GEOCODER_BACKENDS:
+        try:
+            backends.append(load_backend(config))
+        except Exception as e:
+            # A missing gazetteer file or optional dependency only disables
+            # that backend; the remaining ones still answer.
+            logger.warning("Could not load geocoder backend %s: %s", config['BACKEND'], e)
+    geocoder = ChainGeocoder(backends)
+    if settings.GEOCODER_CACHE is not None:
+        geocoder = CachedGeocoder(geocoder, **settings.GEOCODER_CACHE)
+    return geocoder
+
+
+@receiver(setting_changed)
+def reset_geocoder(setting, **kwargs):
+    if setting in ('GEOCODER_BACKENDS', 'GEOCODER_CACHE'):
+        get_geocoder.cache_clear()
+
+
+def reverse_geocode(latitude, longitude):
+    """Resolve a coordinate to an address dict with road/district keys."""
+    return get_geocoder().reverse(latitude, longitude)
+
+
+def geocoder_cache_stats():
+    """Hit/miss counters of this process's geocode cache, if enabled."""
+    geocoder = get_geocoder()
+    return dict(geocoder.stats) if isinstance(geocoder, CachedGeocoder) else None
+
+
+def gazetteer_path():
+    """Path of the first configured GazetteerGeocoder's CSV, or None."""
+    for config in settings.GEOCODER_BACKENDS:
+        if config['BACKEND'].endswith('.GazetteerGeocoder'):
+            return config.get('OPTIONS', {}).get('path')
+    return None
+
+
+def build_gazetteer(path, sources=()):
+    """
+    Write a gazetteer CSV for GazetteerGeocoder from the addresses already
+    resolved into GeocodeCache, plus the places in any `sources` CSVs with
+    the same columns. Returns the number of places written.
+    """
+    from .models import GeocodeCache
+
+    places = {}
+    for key, address in GeocodeCache.objects.values_list('key', 'address').iterator():
+        if address and any(address.get(field) for field in ADDRESS_FIELDS):
+            lat, lon = key.split(',')
+            places[(lat, lon)] = {field: address.get(field) or '' for field in ADDRESS_FIELDS}
+    for source in sources:
+        with open(source, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                places[(row['lat'], row['lon'])] = {field: row.get(field) or '' for field in ADDRESS_FIELDS}
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['lat', 'lon', *ADDRESS_FIELDS])
+        for (lat, lon), address in places.items():
+            writer.writerow([lat, lon, *(address[field] for field in ADDRESS_FIELDS)])
+    return len(places)
+
+
+def format_address(address):
+    return ', '.join(address[field] for field in ADDRESS_FIELDS if address.get(field))
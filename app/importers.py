@@ -0,0 +1,293 @@
+import os
+import traceback
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .changes import bump_version, log_changes
+from .counters import COUNTED_FIELDS, record_asset_change
+from .models import Asset, AssetCategory, AssetSubCategory, ImportJob
+
+REQUIRED_COLUMNS = ['asset_name', 'barcode', 'asset_value', 'condition']
+IMPORT_COLUMNS = REQUIRED_COLUMNS + ['category_name', 'sub_category_name', 'purchase_date']
+# Columns refreshed when an imported barcode already exists
+UPSERT_FIELDS = ['asset_name', 'asset_category', 'purchase_date', 'asset_value', 'condition']
+BATCH_SIZE = 1000
+CHUNK_SIZE = 5000
+MAX_STORED_REJECTIONS = 1000
+
+
+def _clean_text(column):
+    # Strings with surrounding whitespace trimmed; blanks and NaN become None.
+    # Whole numbers read as floats (a numeric column with gaps) lose the '.0'.
+    if pd.api.types.is_float_dtype(column) and (column.dropna() % 1 == 0).all():
+        column = column.astype('Int64')
+    column = column.astype('string').str.strip()
+    column = column.mask(column.eq('').fillna(False))
+    return column.astype(object).where(column.notna(), None)
+
+
+def _parse_dates(column):
+    # Excel cells arrive as timestamps, CSV cells as 'YYYY-MM-DD' strings
+    parsed = pd.to_datetime(column, format='%Y-%m-%d', errors='coerce')
+    return parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+
+def prepare_rows(df):
+    """
+    Validate an import DataFrame column-wise. Returns the importable rows and
+    a list of rejections as {'row', 'barcode', 'reason'} dicts. Row numbers
+    are spreadsheet rows, counting the header as row 1.
+    """
+    df = df.reindex(columns=IMPORT_COLUMNS)
+    rows = pd.DataFrame({
+        column: _clean_text(df[column])
+        for column in IMPORT_COLUMNS if column != 'purchase_date'
+    }, index=df.index)
+    rows['purchase_date'] = _parse_dates(df['purchase_date'])
+    rows['row'] = df.index + 2
+
+    rejected = []
+
+    def reject(mask, reason):
+        nonlocal rows
+        for row, barcode in rows.loc[mask, ['row', 'barcode']].itertuples(index=False):
+            rejected.append({'row': int(row), 'barcode': barcode, 'reason': reason})
+        rows = rows[~mask]
+
+    reject(rows[REQUIRED_COLUMNS].isna().any(axis=1), "Missing required fields")
+    reject(rows['purchase_date'].isna(), "Invalid date format")
+    # The last occurrence of a barcode in the file wins
+    reject(rows.duplicated('barcode', keep='last'), "Duplicate barcode later in file")
+
+    rejected.sort(key=lambda item: item['row'])
+    return rows, rejected
+
+
+def resolve_categories(rows):
+    """
+    Map the rows' category and subcategory names to ids, creating any that
+    are missing in a few set-based queries. Returns {sub_category_name: id}.
+    """
+    category_names = set(rows['category_name'].dropna())
+    categories = dict(AssetCategory.objects.filter(
+        category_name__in=category_names).values_list('category_name', 'category_id'))
+    missing = category_names - categories.keys()
+    if missing:
+        AssetCategory.objects.bulk_create(
+            [AssetCategory(category_name=name) for name in missing])
+        created = dict(AssetCategory.objects.filter(
+            category_name__in=missing).values_list('category_name', 'category_id'))
+        categories.update(created)
+        log_changes(AssetCategory, created.values())
+        bump_version(AssetCategory)
+
+    # New subcategories are linked to the category of their first row
+    pairs = rows[['sub_category_name', 'category_name']].dropna(subset=['sub_category_name'])
+    first_category = pairs.drop_duplicates('sub_category_name').set_index(
+        'sub_category_name')['category_name'].to_dict()
+    subcategories = dict(AssetSubCategory.objects.filter(
+        sub_category_name__in=first_category.keys()).values_list('sub_category_name', 'sub_category_id'))
+    missing = first_category.keys() - subcategories.keys()
+    if missing:
+        AssetSubCategory.objects.bulk_create([
+            AssetSubCategory(sub_category_name=name,
+                             category_id=categories.get(first_category[name]))
+            for name in missing
+        ])
+        created = dict(AssetSubCategory.objects.filter(
+            sub_category_name__in=missing).values_list('sub_category_name', 'sub_category_id'))
+        subcategories.update(created)
+        log_changes(AssetSubCategory, created.values())
+        bump_version(AssetSubCategory)
+    return subcategories
+
+
+def import_assets(df, batch_size=BATCH_SIZE):
+    """
+    Import a DataFrame of products. Assets are upserted on barcode in chunks
+    of `batch_size`, each chunk in its own transaction. Returns a report
+    with the number of imported rows and the rejected rows.
+    """
+    rows, rejected = prepare_rows(df)
+
+    with transaction.atomic():
+        subcategories = resolve_categories(rows)
+
+    assets = [
+        Asset(
+            asset_name=row.asset_name,
+            barcode=row.barcode,
+            asset_category_id=subcategories.get(row.sub_category_name),
+            purchase_date=row.purchase_date,
+            asset_value=row.asset_value,
+            condition=row.condition,
+            location="",
+            assign_to=None,
+            asset_status="available",
+        )
+        for row in rows.itertuples(index=False)
+    ]
+    for start in range(0, len(assets), batch_size):
+        batch = assets[start:start + batch_size]
+        with transaction.atomic():
+            existing = {
+                barcode: tuple(values) for barcode, *values in Asset.objects.filter(
+                    barcode__in=[asset.barcode for asset in batch]).values_list('barcode', *COUNTED_FIELDS)
+            }
+            Asset.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['barcode'],
+                update_fields=UPSERT_FIELDS,
+            )
+            # bulk_create sends no post_save signals. Upserted rows don't get
+            # their pk back on every backend, so look them up by barcode.
+            log_changes(Asset, Asset.objects.filter(
+                barcode__in=[asset.barcode for asset in batch]).values_list('pk', flat=True))
+            bump_version(Asset)
+            # Upserted rows keep their status and assignee, see UPSERT_FIELDS
+            new_values = []
+            for asset in batch:
+                status, _, assign_to_id, _ = existing.get(asset.barcode, ('available', None, None, None))
+                new_values.append((status, asset.condition, assign_to_id, asset.asset_category_id))
+            record_asset_change(existing.values(), new_values)
+
+    return {'imported': len(assets), 'rejected': rejected}
+
+
+def _iter_xlsx_chunks(file, chunk_size):
+    # Read-only mode streams rows from the sheet XML instead of building the
+    # whole workbook in memory.
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        offset = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=header, index=range(offset, offset + len(batch)))
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, index=range(offset, offset + len(batch)))
+    finally:
+        workbook.close()
+
+
+def iter_chunks(file, file_name, chunk_size=CHUNK_SIZE):
+    """
+    Yield DataFrames of at most `chunk_size` rows from a CSV or XLSX file.
+    The index keeps counting across chunks so row numbers stay file-wide.
+    """
+    if file_name.endswith('.csv'):
+        yield from pd.read_csv(file, chunksize=chunk_size)
+    else:
+        yield from _iter_xlsx_chunks(file, chunk_size)
+
+
+def _import_chunks(job, file, chunk_size):
+    # Counters restart so a retried job reports the whole file once; rows
+    # committed by an earlier attempt are simply upserted again.
+    job.rows_processed = job.rows_imported = job.rows_rejected = 0
+    job.rejected = []
+    for chunk in iter_chunks(file, job.file_name, chunk_size):
+        report = import_assets(chunk)
+        job.rows_processed += len(chunk)
+        job.rows_imported += report['imported']
+        job.rows_rejected += len(report['rejected'])
+        room = MAX_STORED_REJECTIONS - len(job.rejected)
+        job.rejected.extend(report['rejected'][:max(room, 0)])
+        job.save(update_fields=['rows_processed', 'rows_imported', 'rows_rejected', 'rejected'])
+
+
+def import_stream(job, file, chunk_size=CHUNK_SIZE):
+    """
+    Import a file chunk by chunk, committing each chunk and recording
+    progress on the ImportJob as it goes. Memory use depends on the chunk
+    size, not on the file size.
+    """
+    try:
+        _import_chunks(job, file, chunk_size)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def _upload_storage():
+    return FileSystemStorage(location=settings.IMPORT_UPLOAD_DIR)
+
+
+def enqueue_import(file):
+    """Store an uploaded file and queue an ImportJob for the workers."""
+    path = _upload_storage().save(file.name, file)
+    return ImportJob.objects.create(file_name=file.name, file_path=path)
+
+
+def claim_next_job(worker):
+    """
+    Atomically take the oldest runnable job for `worker`, or return None.
+    Jobs left running by a worker that died are picked up again after
+    IMPORT_JOB_TIMEOUT seconds, unless they have used up their attempts.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.IMPORT_JOB_TIMEOUT)
+    # A job that keeps killing its worker (OOM, kill) must not run forever
+    ImportJob.objects.filter(
+        status='running', started_at__lt=stale, attempts__gte=F('max_attempts'),
+    ).update(status='failed', finished_at=now,
+             error="Worker stopped responding on the last attempt")
+    runnable = (Q(status='queued', available_at__lte=now)
+                | Q(status='running', started_at__lt=stale, attempts__lt=F('max_attempts')))
+    candidates = ImportJob.objects.filter(runnable).order_by(
+        'available_at').values_list('pk', 'status', 'started_at')[:10]
+    for pk, status, started_at in candidates:
+        # Only one worker's UPDATE can match the row's current state
+        claimed = ImportJob.objects.filter(pk=pk, status=status, started_at=started_at).update(
+            status='running', locked_by=worker, started_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            return ImportJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job, chunk_size=CHUNK_SIZE):
+    """
+    Process a claimed job. Failures are retried with a growing delay until
+    max_attempts is reached; the traceback of the last error is kept.
+    """
+    storage = _upload_storage()
+    try:
+        with storage.open(job.file_path, 'rb') as file:
+            _import_chunks(job, file, chunk_size)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.available_at = timezone.now() + timedelta(
+                seconds=settings.IMPORT_RETRY_DELAY * job.attempts)
+            job.save(update_fields=['status', 'error', 'available_at'])
+            return job
+        job.status = 'failed'
+    else:
+        job.status = 'completed'
+        job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    if os.path.exists(storage.path(job.file_path)):
+        storage.delete(job.file_path)
+    return job
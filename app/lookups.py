@@ -0,0 +1,52 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .changes import table_versions
+from .models import Asset, AssetCategory, AssetSubCategory, UserDetails
+from .serializers import AssetSerializer
+
+MAX_LOOKUP_BARCODES = 500
+
+
+def _key_prefix():
+    # Saving or deleting an asset, including through the bulk paths, bumps
+    # the Asset version, and so do renames of the category, subcategory and
+    # user names serialized with it. Every worker then misses its stale keys.
+    versions = table_versions(Asset, AssetCategory, AssetSubCategory, UserDetails)
+    return 'barcode:' + ':'.join(str(version) for version in versions.values()) + ':'
+
+
+def _cache_key(prefix, barcode):
+    # Barcodes are user input: hash them into a key any cache backend accepts
+    return prefix + hashlib.md5(barcode.encode()).hexdigest()
+
+
+def _only(data, fields):
+    if fields is None:
+        return data
+    return {name: value for name, value in data.items() if name in fields}
+
+
+def lookup_barcodes(barcodes, fields=None):
+    """
+    {barcode: serialized asset} for those of `barcodes` that exist. Cached
+    assets are read from the cache in one call and the rest are loaded in
+    one query and cached in full, whatever `fields` asks for.
+    """
+    barcodes = list(dict.fromkeys(barcodes))
+    prefix = _key_prefix()
+    keys = {_cache_key(prefix, barcode): barcode for barcode in barcodes}
+    cached = cache.get_many(list(keys))
+    products = {keys[key]: data for key, data in cached.items()}
+
+    missing = [barcode for barcode in barcodes if barcode not in products]
+    if missing:
+        assets = AssetSerializer.setup_eager_loading(Asset.objects.filter(barcode__in=missing))
+        loaded = {asset.barcode: dict(AssetSerializer(asset).data) for asset in assets}
+        cache.set_many({_cache_key(prefix, barcode): data for barcode, data in loaded.items()},
+                       settings.BARCODE_CACHE_SECONDS)
+        products.update(loaded)
+
+    return {barcode: _only(data, fields) for barcode, data in products.items()}
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from app.models import Asset, RequestAsset
+from app.pagination import compact_data
+from app.renderers import MessagePackRenderer
+from app.serializers import AssetSerializer, RequestAssetSerializer
+
+PAYLOADS = [
+    ('assets', Asset, AssetSerializer),
+    ('requests', RequestAsset, RequestAssetSerializer),
+]
+
+
+class Command(BaseCommand):
+    help = "Compare payload size and encode time of the JSON and MessagePack renderers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=5000,
+            help="Rows per payload; the rows in the database are repeated to reach it.")
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help="Number of encodes to average over.")
+
+    def time_render(self, renderer, data, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            body = renderer.render(data)
+        return len(body), (time.perf_counter() - started) / repeat * 1000
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        renderers = [('json', JSONRenderer()), ('msgpack', MessagePackRenderer())]
+
+        self.stdout.write(f"{'payload':<18}{'format':<10}{'bytes':>12}{'encode ms':>12}")
+        for name, model, serializer_class in PAYLOADS:
+            queryset = serializer_class.setup_eager_loading(model.objects.all())
+            serializer = serializer_class(queryset, many=True)
+            sample = serializer.data
+            if not sample:
+                self.stderr.write(f"No {name} in the database, skipping.")
+                continue
+            data = [sample[i % len(sample)] for i in range(rows)]
+            compact = compact_data(serializer)
+            compact['rows'] = [compact['rows'][i % len(sample)] for i in range(rows)]
+
+            for shape, payload in [(name, data), (f"{name} compact", compact)]:
+                for format_name, renderer in renderers:
+                    size, elapsed = self.time_render(renderer, payload, repeat)
+                    self.stdout.write(f"{shape:<18}{format_name:<10}{size:>12}{elapsed:>12.2f}")
+
+        if not any(model.objects.exists() for _, model, _ in PAYLOADS):
+            raise CommandError("Nothing to benchmark: add some assets or requests first.")
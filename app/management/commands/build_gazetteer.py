@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.geocoding import build_gazetteer, gazetteer_path
+
+
+class Command(BaseCommand):
+    help = ("Build the offline gazetteer CSV from the addresses cached in GeocodeCache "
+            "and any extra place lists.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=None,
+            help="CSV to write (defaults to the GazetteerGeocoder path in GEOCODER_BACKENDS).")
+        parser.add_argument(
+            '--source', action='append', dest='sources', default=[],
+            help="Extra CSV of places (lat, lon, road, state_district, city_district). "
+                 "May be given more than once.")
+
+    def handle(self, *args, **options):
+        path = options['output'] or gazetteer_path()
+        if path is None:
+            raise CommandError("No GazetteerGeocoder in GEOCODER_BACKENDS; pass --output.")
+        places = build_gazetteer(path, options['sources'])
+        if not places:
+            self.stdout.write(self.style.WARNING(
+                f"No places found; {path} only has a header and the offline geocoder stays off."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Wrote {places} places to {path}."))
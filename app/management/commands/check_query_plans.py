@@ -0,0 +1,80 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from app.models import Allocation, Asset, StockHistory
+
+
+def hot_queries():
+    today = date.today()
+    return [
+        ("assets by status", Asset.objects.filter(asset_status='in-use')),
+        ("assets without barcode", Asset.objects.filter(barcode__isnull=True)),
+        ("asset by barcode", Asset.objects.filter(barcode='BC1')),
+        ("assets of a station", Asset.objects.filter(assign_to__station__station_name='Central')),
+        ("assets of a user", Asset.objects.filter(assign_to__username='user')),
+        ("allocations due soon", Allocation.objects.filter(
+            user__username='user', expected_return_date__gte=today,
+            expected_return_date__lte=today + timedelta(days=7))),
+        ("stock history of an asset", StockHistory.objects.filter(asset_id=1).order_by('date')),
+        ("stock history on a day", StockHistory.objects.filter(asset_id=1, date=today)),
+    ]
+
+
+# Queries that cannot use a b-tree index; reported but not failed
+KNOWN_SCANS = [
+    ("product search without FTS5", Asset.objects.filter(asset_name__icontains='laptop'),
+     "icontains fallback of app/search.py on databases other than SQLite"),
+]
+
+FULL_SCAN_PATTERNS = {
+    # SEARCH means an index lookup; SCAN reads the whole table or index
+    'sqlite': re.compile(r'\bSCAN (\S+)'),
+    'postgresql': re.compile(r'\bSeq Scan on (\S+)'),
+}
+
+
+def explain(queryset):
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Small tables are cheaper to scan; ask what the indexes allow
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot queries and fail if any of them scans a whole table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help="Print the full plan of every query.")
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Don't know how to read {connection.vendor} query plans.")
+
+        failed = []
+        for name, queryset in hot_queries():
+            plan = explain(queryset)
+            scans = pattern.findall(plan)
+            if scans:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f"SCAN  {name}: {', '.join(scans)}"))
+            else:
+                self.stdout.write(f"ok    {name}")
+            if scans or options['verbose_plans']:
+                self.stdout.write(plan)
+
+        for name, queryset, reason in KNOWN_SCANS:
+            scans = pattern.findall(explain(queryset))
+            self.stdout.write(self.style.WARNING(
+                f"known {name}: {', '.join(scans) or 'no scan'} ({reason})"))
+
+        if failed:
+            raise CommandError(f"{len(failed)} hot queries fall back to a full table scan.")
+        self.stdout.write(self.style.SUCCESS("All hot queries use an index."))
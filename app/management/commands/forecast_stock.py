@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from app.forecasting import FORECAST_DAYS, run_batch_forecast
+
+
+class Command(BaseCommand):
+    help = "Fit stock forecasts for all assets in a process pool and store them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Number of worker processes (defaults to the CPU count).")
+        parser.add_argument(
+            '--asset', type=int, action='append', dest='asset_ids',
+            help="Only forecast this asset id. May be given more than once.")
+        parser.add_argument(
+            '--horizon', type=int, default=FORECAST_DAYS,
+            help="Number of days to forecast.")
+
+    def handle(self, *args, **options):
+        result = run_batch_forecast(
+            asset_ids=options['asset_ids'],
+            workers=options['workers'],
+            steps=options['horizon'],
+        )
+
+        for asset_id, error in sorted(result['failures'].items()):
+            self.stderr.write(f"Asset {asset_id}: {error}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast {result['succeeded']}/{result['assets']} assets "
+            f"in {result['elapsed']:.1f}s ({result['assets_per_second']:.1f} assets/s), "
+            f"{len(result['failures'])} failed."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from app.counters import counter_drift, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the inventory counters from the Asset table and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report drift, leave the counters as they are.")
+
+    def handle(self, *args, **options):
+        drift = counter_drift() if options['check'] else rebuild_counters()
+
+        for (dimension, key), (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"{dimension}={key!r}: stored {stored}, actual {actual}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters match the Asset table."))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} counters have drifted."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt counters, {len(drift)} had drifted."))
@@ -0,0 +1,66 @@
+import os
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from app.importers import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued product imports."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=2,
+            help="Number of jobs processed at the same time.")
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Seconds to wait when the queue is empty.")
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit once the queue is empty instead of polling forever.")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(target=self.work, args=(f"{name}:{i}", options), daemon=True)
+            for i in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the current jobs finish...")
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, worker, options):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    job = claim_next_job(worker)
+                    if job is None:
+                        if options['once']:
+                            return
+                        self.stop.wait(options['poll_interval'])
+                        continue
+                    self.stdout.write(f"[{worker}] Import {job.pk} ({job.file_name}) attempt {job.attempts}")
+                    job = run_job(job)
+                    self.stdout.write(
+                        f"[{worker}] Import {job.pk} {job.status}: {job.rows_imported} imported, "
+                        f"{job.rows_rejected} rejected")
+                except Exception as e:
+                    # e.g. a locked database; an unfinished job is picked up
+                    # again once IMPORT_JOB_TIMEOUT has passed
+                    self.stderr.write(f"[{worker}] {e}")
+                    self.stop.wait(options['poll_interval'])
+        finally:
+            connection.close()
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_tender_stockhistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('forecast_date', models.DateField()),
+                ('stock_level', models.IntegerField()),
+                ('model_version', models.CharField(max_length=50)),
+                ('generated_at', models.DateTimeField()),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='app.asset')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('asset', 'forecast_date'), name='unique_asset_forecast_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_geocodecache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='asset',
+            name='asset_id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='assetcategory',
+            name='category_id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='assetsubcategory',
+            name='sub_category_id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+    ]
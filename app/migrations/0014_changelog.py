@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+SYNC_MODELS = ['Asset', 'Allocation', 'RequestAsset', 'AssetCategory', 'AssetSubCategory']
+
+
+def log_existing_rows(apps, schema_editor):
+    # Seed the log with every existing row so a sync from 0 is a full download
+    ChangeLog = apps.get_model('app', 'ChangeLog')
+    for name in SYNC_MODELS:
+        model = apps.get_model('app', name)
+        ChangeLog.objects.bulk_create(
+            (ChangeLog(table=model._meta.label_lower, object_id=pk, action='upsert')
+             for pk in model.objects.order_by('pk').values_list('pk', flat=True).iterator()),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='allocation',
+            name='allocation_id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='requestasset',
+            name='request_id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
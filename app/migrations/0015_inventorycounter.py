@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_assets(apps, schema_editor):
+    # Same keys as app.counters.counter_keys()
+    Asset = apps.get_model('app', 'Asset')
+    InventoryCounter = apps.get_model('app', 'InventoryCounter')
+    counts = {}
+    groups = Asset.objects.values_list(
+        'asset_status', 'condition', 'assign_to_id', 'asset_category_id').annotate(rows=Count('pk')).order_by()
+    for status, condition, assign_to_id, category_id, rows in groups:
+        keys = [('total', ''), ('status', status or ''), ('condition', condition or ''),
+                ('assigned', 'yes' if assign_to_id else 'no'),
+                ('subcategory', str(category_id or ''))]
+        if assign_to_id:
+            keys.append(('user', str(assign_to_id)))
+        for key in keys:
+            counts[key] = counts.get(key, 0) + rows
+    InventoryCounter.objects.bulk_create([
+        InventoryCounter(dimension=dimension, key=key, count=count)
+        for (dimension, key), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='unique_inventory_counter')],
+            },
+        ),
+        migrations.RunPython(count_assets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:09
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_history(apps, schema_editor):
+    # The unique constraint allows one row per asset and day; keep the newest
+    StockHistory = apps.get_model('app', 'StockHistory')
+    duplicates = StockHistory.objects.values('asset_id', 'date').annotate(
+        rows=Count('id'), keep=Max('id')).filter(rows__gt=1).order_by()
+    for row in duplicates:
+        StockHistory.objects.filter(
+            asset_id=row['asset_id'], date=row['date']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_inventorycounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='allocation',
+            index=models.Index(fields=['user', 'expected_return_date'], name='allocation_user_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['asset_status'], name='asset_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stationdetails',
+            index=models.Index(fields=['station_name'], name='station_name_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_history, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='stockhistory',
+            constraint=models.UniqueConstraint(fields=('asset', 'date'), name='unique_stock_history_date'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+from django.db import migrations
+
+# Full-text index over assets for /api/search/. The FTS5 table is keyed by
+# asset_id (its rowid) and kept in step by triggers, so bulk inserts and
+# queryset updates are indexed as well. Only created on SQLite; other
+# databases fall back to icontains lookups in app/search.py.
+
+ASSET_ROW = """
+    SELECT a.asset_id, a.asset_name, COALESCE(a.barcode, ''),
+           COALESCE(s.sub_category_name, ''), COALESCE(c.category_name, '')
+    FROM app_asset a
+    LEFT JOIN app_assetsubcategory s ON s.sub_category_id = a.asset_category_id
+    LEFT JOIN app_assetcategory c ON c.category_id = s.category_id
+"""
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE app_asset_search USING fts5(
+        asset_name, barcode, sub_category_name, category_name,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    f"""
+    INSERT INTO app_asset_search (rowid, asset_name, barcode, sub_category_name, category_name)
+    {ASSET_ROW}
+    """,
+    f"""
+    CREATE TRIGGER app_asset_search_insert AFTER INSERT ON app_asset BEGIN
+        INSERT INTO app_asset_search (rowid, asset_name, barcode, sub_category_name, category_name)
+        {ASSET_ROW} WHERE a.asset_id = NEW.asset_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER app_asset_search_update
+    AFTER UPDATE OF asset_id, asset_name, barcode, asset_category_id ON app_asset BEGIN
+        DELETE FROM app_asset_search WHERE rowid = OLD.asset_id;
+        INSERT INTO app_asset_search (rowid, asset_name, barcode, sub_category_name, category_name)
+        {ASSET_ROW} WHERE a.asset_id = NEW.asset_id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_asset_search_delete AFTER DELETE ON app_asset BEGIN
+        DELETE FROM app_asset_search WHERE rowid = OLD.asset_id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_asset_search_subcategory
+    AFTER UPDATE OF sub_category_name, category_id ON app_assetsubcategory BEGIN
+        UPDATE app_asset_search SET
+            sub_category_name = NEW.sub_category_name,
+            category_name = COALESCE(
+                (SELECT category_name FROM app_assetcategory WHERE category_id = NEW.category_id), '')
+        WHERE rowid IN (SELECT asset_id FROM app_asset WHERE asset_category_id = NEW.sub_category_id);
+    END
+    """,
+    """
+    CREATE TRIGGER app_asset_search_category
+    AFTER UPDATE OF category_name ON app_assetcategory BEGIN
+        UPDATE app_asset_search SET category_name = NEW.category_name
+        WHERE rowid IN (
+            SELECT a.asset_id FROM app_asset a
+            JOIN app_assetsubcategory s ON s.sub_category_id = a.asset_category_id
+            WHERE s.category_id = NEW.category_id);
+    END
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS app_asset_search_category",
+    "DROP TRIGGER IF EXISTS app_asset_search_subcategory",
+    "DROP TRIGGER IF EXISTS app_asset_search_delete",
+    "DROP TRIGGER IF EXISTS app_asset_search_update",
+    "DROP TRIGGER IF EXISTS app_asset_search_insert",
+    "DROP TABLE IF EXISTS app_asset_search",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
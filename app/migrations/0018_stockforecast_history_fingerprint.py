@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_asset_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockforecast',
+            name='history_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+    ]
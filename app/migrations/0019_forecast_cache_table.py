@@ -0,0 +1,21 @@
+from django.core.management import call_command
+from django.db import migrations
+
+# The 'forecasts' cache (see CACHES in settings.py) is a DatabaseCache, so
+# its table has to exist on checkouts set up with `migrate` alone.
+# createcachetable skips tables that are already there.
+
+
+def create_cache_tables(apps, schema_editor):
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_stockforecast_history_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from importlib import import_module
+
+from django.db import migrations
+
+# The per-row timestamps were never read: conditional GETs use the
+# TableVersion counters. SQLite drops a column by rebuilding the table,
+# which the asset search triggers refer to, so they are dropped first and
+# created again afterwards.
+asset_search = import_module('app.migrations.0017_asset_search')
+TRIGGER_SQL = [sql for sql in asset_search.CREATE_SQL if 'CREATE TRIGGER' in sql]
+DROP_TRIGGER_SQL = [sql for sql in asset_search.DROP_SQL if 'DROP TRIGGER' in sql]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_forecast_cache_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(asset_search.run_on_sqlite(DROP_TRIGGER_SQL),
+                             asset_search.run_on_sqlite(TRIGGER_SQL)),
+        migrations.RemoveField(
+            model_name='asset',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='assetcategory',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='assetsubcategory',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='requestasset',
+            name='updated_at',
+        ),
+        migrations.RunPython(asset_search.run_on_sqlite(TRIGGER_SQL),
+                             asset_search.run_on_sqlite(DROP_TRIGGER_SQL)),
+    ]
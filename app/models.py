@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from datetime import timedelta
 from django.utils import timezone
 
@@ -21,6 +21,18 @@ REQUEST_STATUS_CHOICES = [
     ('Rejected', 'Rejected'),
 ]
 
+CHANGE_ACTION_CHOICES = [
+    ('upsert', 'Created or updated'),
+    ('delete', 'Deleted'),
+]
+
+IMPORT_STATUS_CHOICES = [
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('completed', 'Completed'),
+    ('failed', 'Failed'),
+]
+
 
 class stationDetails(models.Model):
     station_id = models.IntegerField(primary_key=True)
@@ -28,6 +40,11 @@ class stationDetails(models.Model):
     station_code = models.CharField(max_length=255)
     station_address = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['station_name'], name='station_name_idx'),
+        ]
+
     def __str__(self):
         return self.station_name
 
@@ -70,7 +87,7 @@ class Status(models.Model):
 
 
 class AssetCategory(models.Model):
-    category_id = models.IntegerField(primary_key=True)
+    category_id = models.AutoField(primary_key=True)
     category_name = models.CharField(max_length=255)
 
     def __str__(self):
@@ -78,7 +95,7 @@ class AssetCategory(models.Model):
 
 
 class AssetSubCategory(models.Model):
-    sub_category_id = models.IntegerField(primary_key=True)
+    sub_category_id = models.AutoField(primary_key=True)
     category = models.ForeignKey(
         AssetCategory, null=True, blank=True, on_delete=models.SET_NULL)
     sub_category_name = models.CharField(max_length=255)
@@ -88,8 +105,68 @@ class AssetSubCategory(models.Model):
         return self.sub_category_name
 
 
+# Asset columns remembered when a row is loaded, so save() can tell what
+# changed without reading the row again
+TRACKED_ASSET_FIELDS = ['asset_status', 'condition', 'assign_to_id', 'asset_category_id']
+
+
+def sync_status_records(transitions):
+    """
+    Keep ExpiredProduct and Maintenance in step with asset status changes,
+    given as (asset_id, old_status, new_status) tuples. Entering a status
+    adds a record if the asset has none; leaving it removes its records.
+    """
+    for status, model in (('expired', ExpiredProduct), ('in-maintenance', Maintenance)):
+        entered = [pk for pk, old, new in transitions if new == status and old != status]
+        left = [pk for pk, old, new in transitions if old == status and new != status]
+        if left:
+            model.objects.filter(asset_id__in=left).delete()
+        if entered:
+            existing = set(model.objects.filter(
+                asset_id__in=entered).values_list('asset_id', flat=True))
+            model.objects.bulk_create(
+                [model(asset_id=pk) for pk in entered if pk not in existing])
+
+
+class AssetQuerySet(models.QuerySet):
+    def set_status(self, status, **fields):
+        """
+        Move every asset in the queryset to `status`, and set any other
+        `fields`, with one UPDATE. Does the same ExpiredProduct/Maintenance
+        bookkeeping, counter updates and change logging as Asset.save().
+        Returns the number of assets updated.
+        """
+        from .changes import bump_version, log_changes
+        from .counters import COUNTED_FIELDS, record_asset_change
+
+        with transaction.atomic():
+            rows = list(self.select_for_update().values_list('pk', *COUNTED_FIELDS))
+            if not rows:
+                return 0
+            pks = [pk for pk, *_ in rows]
+            Asset.objects.filter(pk__in=pks).update(
+                asset_status=status, asset_add_date=timezone.now().date(), **fields)
+
+            changed = {'asset_status': status}
+            for name, value in fields.items():
+                attname = self.model._meta.get_field(name).attname
+                changed[attname] = value.pk if isinstance(value, models.Model) else value
+            old_values = [tuple(values) for _, *values in rows]
+            new_values = [tuple(changed.get(field, value) for field, value in zip(COUNTED_FIELDS, values))
+                          for values in old_values]
+            record_asset_change(old_values, new_values)
+
+            status_index = COUNTED_FIELDS.index('asset_status')
+            sync_status_records([(pk, values[status_index], status)
+                                 for pk, values in zip(pks, old_values)])
+            # A queryset update sends no post_save signals
+            log_changes(Asset, pks)
+            bump_version(Asset)
+        return len(pks)
+
+
 class Asset(models.Model):
-    asset_id = models.IntegerField(primary_key=True, unique=True)
+    asset_id = models.AutoField(primary_key=True)
     asset_name = models.CharField(max_length=255)
     asset_category = models.ForeignKey(
         AssetSubCategory, null=True, blank=True, on_delete=models.SET_NULL)
@@ -107,37 +184,73 @@ class Asset(models.Model):
     asset_maintenance_date = models.DateField(null=True, blank=True)
     asset_add_date = models.DateField(auto_now=True, null=True, blank=True)
 
+    objects = AssetQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['asset_status'], name='asset_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in TRACKED_ASSET_FIELDS}
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # The reloaded columns are what the next save() has to diff against
+        if fields is None:
+            refreshed = set(TRACKED_ASSET_FIELDS) - self.get_deferred_fields()
+        else:
+            refreshed = {getattr(self._meta.get_field(name), 'attname', None) for name in fields}
+        loaded = getattr(self, '_loaded_values', {})
+        loaded.update({field: getattr(self, field)
+                       for field in TRACKED_ASSET_FIELDS if field in refreshed})
+        self._loaded_values = loaded
+
+    def _stored_values(self):
+        # The tracked columns as they are in the database, None for a new row
+        if self._state.adding and self.pk is None:
+            return None
+        loaded = getattr(self, '_loaded_values', {})
+        if not self._state.adding and len(loaded) == len(TRACKED_ASSET_FIELDS):
+            return loaded
+        # Built by hand or loaded with deferred fields: ask the database
+        return Asset.objects.filter(pk=self.pk).values(*TRACKED_ASSET_FIELDS).first()
+
     def save(self, *args, **kwargs):
-        # Determine if the instance is being updated
-        try:
-            existing_asset = Asset.objects.get(
-                pk=self.pk)  # Fetch the previous state
-            previous_status = existing_asset.asset_status
-        except Asset.DoesNotExist:
-            previous_status = None
-
-        super().save(*args, **kwargs)  # Save the Asset instance first
-
-        # Handle ExpiredProduct logic
-        if self.asset_status == 'expired' and previous_status != 'expired':
-            # Add to ExpiredProduct table if it is not already there
-            ExpiredProduct.objects.get_or_create(asset=self)
-        elif previous_status == 'expired' and self.asset_status != 'expired':
-            # Remove from ExpiredProduct table if status changes from expired
-            ExpiredProduct.objects.filter(asset=self).delete()
-        if self.asset_status == 'in-maintenance' and previous_status != 'in-maintenance':
-            # Add to ExpiredProduct table if it is not already there
-            Maintenance.objects.get_or_create(asset=self)
-        elif previous_status == 'in-maintenance' and self.asset_status != 'in-maintenance':
-            # Remove from ExpiredProduct table if status changes from expired
-            Maintenance.objects.filter(asset=self).delete()
+        from .counters import COUNTED_FIELDS, record_asset_change
+
+        previous = self._stored_values()
+        current = {field: getattr(self, field) for field in TRACKED_ASSET_FIELDS}
+        update_fields = kwargs.get('update_fields')
+        if previous is not None and update_fields is not None:
+            # Columns left out of update_fields keep their stored value
+            saved = {self._meta.get_field(name).attname for name in update_fields}
+            current = {field: value if field in saved else previous[field]
+                       for field, value in current.items()}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Keep the inventory counters in step with the saved row
+            record_asset_change(
+                [tuple(previous[field] for field in COUNTED_FIELDS)] if previous else [],
+                [tuple(current[field] for field in COUNTED_FIELDS)])
+            # Expired and maintenance records only change with the status
+            previous_status = previous['asset_status'] if previous else None
+            if current['asset_status'] != previous_status:
+                sync_status_records([(self.pk, previous_status, current['asset_status'])])
+        self._loaded_values = current
 
     def __str__(self):
         return self.asset_name
 
 
 class Allocation(models.Model):  # issuedproducts
-    allocation_id = models.IntegerField(primary_key=True, unique=True)
+    allocation_id = models.AutoField(primary_key=True)
     asset = models.ForeignKey(
         Asset, null=True, blank=True, on_delete=models.SET_NULL)
     user = models.ForeignKey(UserDetails, null=True,
@@ -147,12 +260,18 @@ class Allocation(models.Model):  # issuedproducts
     return_date = models.DateField(null=True, blank=True)
     assign_location = models.CharField(max_length=255, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # A user's allocations due within a date range
+            models.Index(fields=['user', 'expected_return_date'], name='allocation_user_due_idx'),
+        ]
+
     def __str__(self):
         return f"Asset : {self.asset} - Allocated to: {self.user}"
 
 
 class RequestAsset(models.Model):
-    request_id = models.IntegerField(primary_key=True, unique=True)
+    request_id = models.AutoField(primary_key=True)
     user = models.ForeignKey(UserDetails, null=True,
                              blank=True, on_delete=models.SET_NULL)
     asset = models.ForeignKey(
@@ -226,5 +345,106 @@ class StockHistory(models.Model):
     date = models.DateField()
     stock_level = models.IntegerField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['asset', 'date'], name='unique_stock_history_date'),
+        ]
+
     def _str_(self):
         return f"{self.asset.asset_name} - {self.stock_level} on {self.date}"
+
+
+class StockForecast(models.Model):
+    asset = models.ForeignKey(
+        Asset, on_delete=models.CASCADE, related_name='forecasts')
+    forecast_date = models.DateField()
+    stock_level = models.IntegerField()
+    model_version = models.CharField(max_length=50)
+    generated_at = models.DateTimeField()
+    # Fingerprint of the stock history the forecast was fitted on
+    history_fingerprint = models.CharField(max_length=16, blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['asset', 'forecast_date'], name='unique_asset_forecast_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.asset_id} - {self.stock_level} on {self.forecast_date}"
+
+
+class GeocodeCache(models.Model):
+    # Quantized "lat,lon" of the looked-up coordinate
+    key = models.CharField(max_length=64, unique=True)
+    address = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.key
+
+
+class ImportJob(models.Model):
+    file_name = models.CharField(max_length=255)
+    # Uploaded file kept on disk until a worker has processed it
+    file_path = models.CharField(max_length=500, blank=True)
+    status = models.CharField(
+        max_length=20, choices=IMPORT_STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    rows_imported = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    # First rejected rows as {'row', 'barcode', 'reason'}, capped in size
+    rejected = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='importjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Import {self.pk}: {self.file_name} ({self.status})"
+
+
+class TableVersion(models.Model):
+    # Bumped on every write to the table, see app/changes.py
+    table = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
+class ChangeLog(models.Model):
+    # Append-only; the id is the cursor that /api/sync/ hands to clients
+    table = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=CHANGE_ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.pk}: {self.action} {self.table} {self.object_id}"
+
+
+class InventoryCounter(models.Model):
+    # Number of assets per dimension value, e.g. ('status', 'in-use'),
+    # maintained by Asset.save() and the bulk paths, see app/counters.py
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='unique_inventory_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.key}: {self.count}"
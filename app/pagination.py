@@ -0,0 +1,64 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on a unique, increasing key. Each page is an indexed
+    range scan from the last key seen, so its cost does not depend on the
+    page's position, and rows inserted meanwhile never shift the pages.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def __init__(self, ordering='pk'):
+        self.ordering = ordering
+
+
+def compact_data(serializer):
+    """
+    Rewrite a list serializer's output as {"fields": [...], "rows": [[...]]},
+    naming each column once instead of repeating the keys in every object.
+    """
+    names = list(serializer.child.fields)
+    # Fields reached through a null relation are left out of an object by
+    # DRF; they become None here so every row keeps the same columns.
+    return {
+        'fields': names,
+        'rows': [[item.get(name) for name in names] for item in serializer.data],
+    }
+
+
+def paginated_response(request, queryset, serializer_class, ordering='pk'):
+    """
+    Serialize `queryset` as a list, or as a {next, previous, results} page
+    when the client sends `cursor` or `page_size`. Clients that send neither
+    keep getting the full list.
+
+    `?fields=a,b` narrows the output and the SELECT to those fields, and
+    `?compact=1` returns the rows as arrays (see compact_data()).
+    """
+    params = request.query_params
+    fields = serializer_class.requested_fields(request)
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        queryset = serializer_class.setup_eager_loading(queryset, fields=fields)
+    compact = params.get('compact') in ('1', 'true')
+
+    def serialize(rows):
+        serializer = serializer_class(rows, many=True, fields=fields)
+        return compact_data(serializer) if compact else serializer.data
+
+    if 'cursor' not in params and 'page_size' not in params:
+        return Response(serialize(queryset))
+
+    paginator = KeysetPagination(ordering=ordering)
+    page = paginator.paginate_queryset(queryset, request)
+    data = serialize(page)
+    if compact:
+        return Response({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            **data,
+        })
+    return paginator.get_paginated_response(data)
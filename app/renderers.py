@@ -0,0 +1,39 @@
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+# Dates, decimals and UUIDs are sent as the same strings the JSON renderer
+# produces, so both formats decode to identical data.
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render responses as MessagePack for clients sending Accept: application/msgpack."""
+    media_type = MSGPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Parse MessagePack request bodies sent as Content-Type: application/msgpack."""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as e:
+            raise ParseError(f"MessagePack parse error - {str(e) or type(e).__name__}")
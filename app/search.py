@@ -0,0 +1,66 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Asset
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# bm25 column weights: asset_name, barcode, sub_category_name, category_name
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+
+def match_expression(query):
+    """
+    Turn user input into an FTS5 MATCH expression: every word must match,
+    the last one as a prefix so results update while typing. Words are
+    quoted, so FTS5 operators in the input are matched as plain text.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _ranked_ids(expression, limit, queryset):
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    sql = "SELECT rowid FROM app_asset_search WHERE app_asset_search MATCH %s"
+    params = [expression]
+    if queryset.query.has_filters():
+        # Restrict to the queryset before LIMIT, so matches outside it
+        # cannot crowd out the ones inside
+        subquery, subquery_params = queryset.values('pk').query.sql_with_params()
+        sql += f" AND rowid IN ({subquery})"
+        params.extend(subquery_params)
+    sql += f" ORDER BY bm25(app_asset_search, {weights}) LIMIT %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_assets(query, limit=SEARCH_LIMIT, queryset=None):
+    """
+    Assets matching `query` by name, barcode, subcategory or category, best
+    match first. Uses the FTS5 index on SQLite and icontains lookups on
+    other databases.
+    """
+    if queryset is None:
+        queryset = Asset.objects.all()
+    # A negative LIMIT means no limit in SQLite
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    expression = match_expression(query or '')
+    if expression is None:
+        return []
+
+    if connection.vendor != 'sqlite':
+        return list(queryset.filter(
+            Q(asset_name__icontains=query) | Q(barcode__icontains=query)
+            | Q(asset_category__sub_category_name__icontains=query)
+            | Q(asset_category__category__category_name__icontains=query))[:limit])
+
+    ids = _ranked_ids(expression, limit, queryset)
+    assets = queryset.in_bulk(ids)
+    return [assets[pk] for pk in ids if pk in assets]
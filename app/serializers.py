@@ -21,29 +21,87 @@ class AssignSerializer(serializers.Serializer):
     return_date = serializers.DateField()
     username = serializers.CharField(max_length=100)
     location = serializers.CharField(max_length=100)
+
+class BulkAssignSerializer(serializers.Serializer):
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=255), allow_empty=False, max_length=500)
+    return_date = serializers.DateField()
+    username = serializers.CharField(max_length=100)
+    location = serializers.CharField(max_length=100)
     
-class AssetSerializer(serializers.ModelSerializer):
+class EagerLoadingMixin:
+    # Relations followed by the serializer's dotted sources. Querysets passed
+    # through setup_eager_loading() join them up front instead of issuing one
+    # query per object.
+    select_related_fields = []
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        if fields is None:
+            return queryset.select_related(*cls.select_related_fields)
+
+        # Only join and load the columns behind the requested fields
+        columns, relations = set(), set()
+        for name, field in cls().fields.items():
+            if name in fields:
+                parts = field.source.split('.')
+                relations.update('__'.join(parts[:i]) for i in range(1, len(parts)))
+                columns.add('__'.join(parts))
+        return queryset.select_related(*relations).only(*(columns | relations))
+
+class SparseFieldsMixin:
+    """
+    Takes an optional `fields` list and drops every other field from the
+    output, e.g. AssetSerializer(assets, many=True, fields=['asset_id', 'barcode']).
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request):
+        """
+        Field names from a `?fields=a,b` query parameter, or None. Names the
+        serializer does not have raise a ValidationError (400).
+        """
+        raw = request.query_params.get('fields')
+        if not raw:
+            return None
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in cls().fields]
+        if unknown:
+            raise serializers.ValidationError({'fields': [f"Unknown fields: {', '.join(unknown)}"]})
+        return names
+
+class AssetSerializer(SparseFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     asset_category = serializers.CharField(source='asset_category.category.category_name', read_only=True)  
     asset_sub_category = serializers.CharField(source='asset_category.sub_category_name', read_only=True)   
     assign_to = serializers.CharField(source='assign_to.username', read_only=True)   
+    select_related_fields = ['asset_category__category', 'assign_to']
+
     class Meta:
         model = Asset
-        fields = ['asset_id', 'asset_name', 'barcode', 'purchase_date', 'asset_value', 'condition', 'location', 'asset_category', 'asset_sub_category', 'assign_to']  # or specify individual fields
+        fields = ['asset_id', 'asset_name', 'barcode', 'purchase_date', 'asset_value', 'condition', 'asset_status', 'location', 'asset_category', 'asset_sub_category', 'assign_to']  # or specify individual fields
 
 class BarcodeUpdateSerializer(serializers.Serializer):
     barcode = serializers.CharField(max_length=255)
         
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     role = serializers.CharField(source='role.role', read_only=True)  # Assuming 'name' is the field in the Role model
     station = serializers.CharField(source='station.station_name', read_only=True)  # Assuming 'station_name' is the field in the StationDetails model
+    select_related_fields = ['role', 'station']
 
     class Meta:
         model = UserDetails
         fields = ['first_name', 'last_name', 'role', 'station', 'contact_number']
         
-class RequestAssetSerializer(serializers.ModelSerializer):
+class RequestAssetSerializer(SparseFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
-    asset_category = serializers.CharField(source='asset_sub_category.name', read_only=True)
+    asset_category = serializers.CharField(source='asset_sub_category.sub_category_name', read_only=True)
+    select_related_fields = ['user', 'asset_sub_category']
 
     class Meta:
         model = RequestAsset
@@ -58,16 +116,31 @@ class RequestAssetSerializer(serializers.ModelSerializer):
             'request_status'
         ]
         
-class SubcategorySerializer(serializers.ModelSerializer):
+class AssetCategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = AssetCategory
+        fields = ['category_id', 'category_name']
+        
+class SubcategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AssetSubCategory
         fields = '__all__'
         
-class AllocationSerializer(serializers.ModelSerializer):
+class AllocationSerializer(SparseFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     asset_name = serializers.CharField(source='asset.asset_name', read_only=True)
     barcode = serializers.CharField(source='asset.barcode', read_only=True)
     assign_to = serializers.CharField(source='user.username', read_only=True)
+    select_related_fields = ['asset', 'user']
 
     class Meta:
         model = Allocation
-        fields = ['allocation_id', 'asset_name', 'barcode', 'assign_date', 'expected_return_date', 'assign_to']
\ No newline at end of file
+        fields = ['allocation_id', 'asset_name', 'barcode', 'assign_date', 'expected_return_date', 'assign_to']
+
+class ImportJobSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'file_name', 'status', 'attempts', 'max_attempts', 'rows_processed', 'rows_imported', 'rows_rejected', 'error', 'created_at', 'started_at', 'finished_at']
+
+class ImportJobDetailSerializer(ImportJobSerializer):
+    class Meta(ImportJobSerializer.Meta):
+        fields = ImportJobSerializer.Meta.fields + ['rejected']
@@ -16,3 +16,100 @@
 #                 next_maintenance_date=instance.purchase_date + timedelta(days=180),  # Example maintenance schedule
 #                 maintenance_cost='0',
 #             )
+
+
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .autocomplete import asset_deleted, asset_saved
+from .categories import invalidate_category_tree
+from .changes import SYNC_MODELS, bump_version, log_changes
+from .counters import COUNTED_FIELDS, move_assets, record_asset_change
+from .forecasting import invalidate_forecast
+from .models import Asset, AssetCategory, AssetSubCategory, RequestAsset, StockHistory, UserDetails
+
+# Tables whose version counters back the ETags of the polled API endpoints
+VERSIONED_MODELS = [Asset, AssetCategory, AssetSubCategory, RequestAsset, UserDetails]
+
+
+@receiver([post_save, post_delete], sender=StockHistory)
+def invalidate_stock_forecast(sender, instance, **kwargs):
+    # New or edited history makes any cached forecast for the asset stale
+    invalidate_forecast(instance.asset_id)
+
+
+# Columns no versioned response shows: saving only these leaves the version
+# alone, so a login does not invalidate every user's cached responses
+UNVERSIONED_FIELDS = {UserDetails: {'last_login'}}
+
+
+def bump_table_version(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= UNVERSIONED_FIELDS.get(sender, set()):
+        return
+    bump_version(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_table_version, sender=model)
+    post_delete.connect(bump_table_version, sender=model)
+
+
+def log_saved(sender, instance, **kwargs):
+    log_changes(sender, [instance.pk])
+
+
+def log_deleted(sender, instance, **kwargs):
+    log_changes(sender, [instance.pk], action='delete')
+
+
+def log_set_null_updates(sender, instance, **kwargs):
+    # Deleting a row nulls the foreign keys pointing at it with a plain
+    # UPDATE and no post_save, so log the synced rows it is about to touch.
+    for relation in sender._meta.related_objects:
+        if relation.related_model in SYNC_MODELS and relation.on_delete is models.SET_NULL:
+            related_ids = relation.related_model.objects.filter(
+                **{relation.field.name: instance}).values_list('pk', flat=True)
+            log_changes(relation.related_model, related_ids)
+
+
+for model in SYNC_MODELS:
+    post_save.connect(log_saved, sender=model)
+    post_delete.connect(log_deleted, sender=model)
+for model in SYNC_MODELS + [UserDetails]:
+    pre_delete.connect(log_set_null_updates, sender=model)
+
+
+@receiver([post_save, post_delete], sender=AssetCategory)
+@receiver([post_save, post_delete], sender=AssetSubCategory)
+def invalidate_categories(sender, **kwargs):
+    invalidate_category_tree()
+
+
+@receiver(post_delete, sender=Asset)
+def count_deleted_asset(sender, instance, **kwargs):
+    record_asset_change([tuple(getattr(instance, field) for field in COUNTED_FIELDS)], [])
+
+
+@receiver(pre_delete, sender=UserDetails)
+def count_unassigned_assets(sender, instance, **kwargs):
+    # The user's assets are unassigned by SET_NULL, bypassing Asset.save()
+    move_assets(Asset.objects.filter(assign_to=instance), 'assign_to_id', None)
+
+
+@receiver(pre_delete, sender=AssetSubCategory)
+def count_uncategorised_assets(sender, instance, **kwargs):
+    move_assets(Asset.objects.filter(asset_category=instance), 'asset_category_id', None)
+
+
+@receiver(post_save, sender=Asset)
+def index_saved_asset(sender, instance, **kwargs):
+    # After commit, so a rolled back save never shows up in the index
+    asset_id, barcode, asset_name = instance.pk, instance.barcode, instance.asset_name
+    transaction.on_commit(lambda: asset_saved(asset_id, barcode, asset_name))
+
+
+@receiver(post_delete, sender=Asset)
+def unindex_deleted_asset(sender, instance, **kwargs):
+    asset_id = instance.pk
+    transaction.on_commit(lambda: asset_deleted(asset_id))
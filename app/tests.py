@@ -1,3 +1,791 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+import pandas as pd
+from openpyxl import load_workbook
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .autocomplete import PrefixIndex, reset_index
+from .changes import log_changes
+from .counters import counter_drift, get_counters
+from .dashboard import get_dashboard_stats
+from .exports import INVENTORY_SHEETS, PRODUCT_EXPORT_HEADER
+from .forecasting import FORECAST_DAYS, get_forecast, history_fingerprint, run_batch_forecast
+from .geocoding import (CachedGeocoder, ChainGeocoder, GazetteerGeocoder, GeocoderError,
+                        StaticGeocoder, build_gazetteer)
+from .importers import claim_next_job, enqueue_import, import_assets, import_stream, run_job
+from .models import (Allocation, Asset, AssetCategory, AssetSubCategory, ExpiredProduct,
+                     GeocodeCache, ImportJob, Maintenance, RequestAsset, StockForecast,
+                     StockHistory, UserDetails, role, stationDetails)
+from .renderers import MSGPACK_MEDIA_TYPE
+from .search import search_assets
+
+CSV_HEADER = "asset_name,barcode,asset_value,condition,category_name,sub_category_name,purchase_date\n"
+
+
+class QueryCountTests(TestCase):
+    """
+    List endpoints must issue the same number of queries whatever the
+    number of rows they return, i.e. no per-object relation lookups.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = AssetCategory.objects.create(category_name='Electronics')
+        cls.sub_category = AssetSubCategory.objects.create(
+            sub_category_name='Laptop', category=cls.category)
+        cls.station = stationDetails.objects.create(
+            station_id=1, station_name='Central', station_code='C', station_address='HQ')
+        cls.role = role.objects.create(role_id=1, role='staff')
+        cls.user = UserDetails.objects.create(
+            user_id=1, username='field-user', password='x', first_name='F', last_name='U',
+            role=cls.role, station=cls.station)
+
+    def setUp(self):
+        # Cached responses would hide the queries of a cold request
+        cache.clear()
+
+    def add_rows(self, count):
+        due = timezone.now().date() + timedelta(days=2)
+        start = Asset.objects.count()
+        for i in range(start, start + count):
+            asset = Asset.objects.create(
+                asset_name=f'Asset {i}', barcode=f'BC{i}', asset_value='100', location='',
+                asset_category=self.sub_category, assign_to=self.user, asset_status='in-use')
+            Allocation.objects.create(
+                allocation_id=i + 1, asset=asset, user=self.user, expected_return_date=due)
+            RequestAsset.objects.create(
+                request_id=i + 1, user=self.user, asset=asset,
+                asset_sub_category=self.sub_category, quantity='1', request_location='HQ')
+            UserDetails.objects.create(
+                user_id=i + 100, username=f'user-{i}', password='x', first_name='U',
+                last_name=str(i), role=self.role, station=self.station)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_rows(1)
+        few = self.count_queries(url)
+        self.add_rows(10)
+        many = self.count_queries(url)
+        self.assertEqual(
+            few, many, f"{url} issued {few} queries for 1 row but {many} for 11 rows")
+
+    def test_asset_list(self):
+        self.assertConstantQueries('/api/asset/')
+
+    def test_asset_list_by_status(self):
+        self.assertConstantQueries('/api/asset/?filter=in-use')
+
+    def test_user_asset_list(self):
+        self.assertConstantQueries('/api/user/asset/?username=field-user')
+
+    def test_user_asset_list_due_soon(self):
+        self.assertConstantQueries('/api/user/asset/?username=field-user&filter=Due Soon')
+
+    def test_user_list(self):
+        self.assertConstantQueries('/api/users/')
+
+    def test_request_list(self):
+        self.assertConstantQueries('/api/requests/')
+
+    def test_dashboard(self):
+        self.assertConstantQueries('/index/')
+
+    def test_totals(self):
+        self.assertConstantQueries('/api/totals/')
+
+    def test_category_tree(self):
+        few = self.count_queries('/api/categories/')
+        for i in range(5):
+            category = AssetCategory.objects.create(category_name=f'Category {i}')
+            AssetSubCategory.objects.create(sub_category_name=f'Sub {i}', category=category)
+        many = self.count_queries('/api/categories/')
+        self.assertEqual(few, many)
+        self.assertEqual(len(self.client.get('/api/categories/').json()), 6)
+
+    def test_product_by_barcode(self):
+        self.add_rows(1)
+        # Table versions for the cache key, then one joined load
+        self.assertEqual(self.count_queries('/api/products/BC0/'), 2)
+
+
+class ConditionalGetTests(TestCase):
+    """Polled endpoints answer 304 until a table they read is written to."""
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_categories_not_modified_until_changed(self):
+        category = AssetCategory.objects.create(category_name='Electronics')
+        etag = self.client.get('/api/categories/')['ETag']
+        self.assertEqual(self.revalidate('/api/categories/', etag), 304)
+
+        AssetSubCategory.objects.create(sub_category_name='Laptop', category=category)
+        self.assertEqual(self.revalidate('/api/categories/', etag), 200)
+
+    def test_login_keeps_etags(self):
+        UserDetails.objects.create(
+            user_id=1, username='crew', password='secret', first_name='C', last_name='W',
+            role=role.objects.create(role_id=1, role='staff'))
+        etag = self.client.get('/api/asset/')['ETag']
+        self.client.post('/api/login/', {'username': 'crew', 'password': 'secret'},
+                         content_type='application/json')
+        self.assertIsNotNone(UserDetails.objects.get(user_id=1).last_login)
+        self.assertEqual(self.revalidate('/api/asset/', etag), 304)
+
+    def test_etag_depends_on_accept(self):
+        json_etag = self.client.get('/api/totals/')['ETag']
+        msgpack_etag = self.client.get('/api/totals/', HTTP_ACCEPT='application/msgpack')['ETag']
+        self.assertNotEqual(json_etag, msgpack_etag)
+
+
+class SyncTests(TestCase):
+    def sync(self, since):
+        response = self.client.get(f'/api/sync/?since={since}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_returns_only_changes_after_cursor(self):
+        category = AssetCategory.objects.create(category_name='Electronics')
+        cursor = self.sync(0)['cursor']
+
+        asset = Asset.objects.create(
+            asset_name='Laptop', barcode='BC1', asset_value='100', location='')
+        category_id = category.category_id
+        category.delete()
+        data = self.sync(cursor)
+        self.assertEqual([row['barcode'] for row in data['assets']['updated']], ['BC1'])
+        self.assertEqual(data['categories']['deleted'], [category_id])
+
+        asset_id = asset.asset_id
+        asset.delete()
+        data = self.sync(data['cursor'])
+        self.assertEqual(data['assets'], {'updated': [], 'deleted': [asset_id]})
+        self.assertEqual(data['categories'], {'updated': [], 'deleted': []})
+
+
+class InventoryCounterTests(TestCase):
+    def test_counters_follow_saves_and_deletes(self):
+        asset = Asset.objects.create(
+            asset_name='Laptop', barcode='BC1', asset_value='100', location='')
+        Asset.objects.create(asset_name='Phone', barcode='BC2', asset_value='50', location='')
+        asset.asset_status = 'expired'
+        asset.condition = 'average'
+        asset.save()
+        Asset.objects.filter(barcode='BC2').delete()
+
+        counters = get_counters()
+        self.assertEqual(counters['total'][''], 1)
+        self.assertEqual(counters['status']['expired'], 1)
+        self.assertEqual(counters['status']['available'], 0)
+        self.assertEqual(counter_drift(), {})
+
+    def test_dashboard_shows_conditions_outside_the_choices(self):
+        Asset.objects.create(asset_name='Laptop', barcode='BC1', asset_value='1', location='',
+                             condition='New')
+        Asset.objects.create(asset_name='Phone', barcode='BC2', asset_value='1', location='')
+        condition = get_dashboard_stats()['condition']
+        self.assertEqual(condition['New'], 1)
+        self.assertEqual(condition['good'], 1)
+        self.assertEqual(condition['below-average'], 0)
+
+
+class AssetStatusTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Asset.objects.create(
+                asset_name=f'Asset {i}', barcode=f'BC{i}', asset_value='100', location='')
+
+    def test_save_does_not_reload_the_row(self):
+        asset = Asset.objects.get(barcode='BC0')
+        asset.asset_name = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            asset.save()
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+
+    def test_set_status_keeps_records_in_step(self):
+        Asset.objects.filter(barcode__in=['BC0', 'BC1']).set_status('expired')
+        self.assertEqual(ExpiredProduct.objects.count(), 2)
+
+        Asset.objects.all().set_status('in-maintenance')
+        self.assertEqual(ExpiredProduct.objects.count(), 0)
+        self.assertEqual(Maintenance.objects.count(), 3)
+        self.assertEqual(get_counters()['status']['in-maintenance'], 3)
+        self.assertEqual(counter_drift(), {})
+
+    def test_save_after_refresh_diffs_against_reloaded_values(self):
+        for fields in (None, ['asset_status']):
+            asset = Asset.objects.get(barcode='BC0')
+            Asset.objects.filter(pk=asset.pk).set_status('in-maintenance')
+            asset.refresh_from_db(fields=fields)
+            asset.asset_status = 'available'
+            asset.save()
+            self.assertFalse(Maintenance.objects.filter(asset=asset).exists())
+            self.assertEqual(counter_drift(), {})
+
+
+class SearchTests(TestCase):
+    def search(self, query):
+        response = self.client.get('/api/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [asset['barcode'] for asset in response.json()]
+
+    def test_index_follows_asset_and_category_changes(self):
+        category = AssetCategory.objects.create(category_name='Computers')
+        sub_category = AssetSubCategory.objects.create(sub_category_name='Notebook', category=category)
+        asset = Asset.objects.create(
+            asset_name='Dell Latitude', barcode='DL1', asset_value='100', location='',
+            asset_category=sub_category)
+        Asset.objects.create(asset_name='Desk', barcode='DK1', asset_value='10', location='')
+
+        self.assertEqual(self.search('lat'), ['DL1'])
+        self.assertEqual(self.search('notebook'), ['DL1'])
+
+        AssetCategory.objects.filter(pk=category.pk).update(category_name='Hardware')
+        self.assertEqual(self.search('hardware'), ['DL1'])
+
+        asset.delete()
+        self.assertEqual(self.search('dell'), [])
+
+    def test_limit_is_clamped(self):
+        for i in range(4):
+            Asset.objects.create(asset_name=f'Laptop {i}', barcode=f'L{i}', asset_value='1', location='')
+        with mock.patch('app.search.MAX_SEARCH_LIMIT', 3):
+            for limit, expected in (('-1', 1), ('0', 1), ('2', 2), ('50', 3)):
+                response = self.client.get('/api/search/', {'q': 'laptop', 'limit': limit})
+                self.assertEqual(len(response.json()), expected, limit)
+
+    def test_filtered_search_ranks_within_the_filter(self):
+        station = stationDetails.objects.create(
+            station_id=1, station_name='North', station_code='N', station_address='N')
+        user = UserDetails.objects.create(
+            user_id=1, username='north', password='x', first_name='N', last_name='N',
+            role=role.objects.create(role_id=1, role='staff'), station=station)
+        for i in range(5):
+            # Better matches than the station's asset, assigned to nobody
+            Asset.objects.create(asset_name='Laptop', barcode=f'L{i}', asset_value='1', location='')
+        Asset.objects.create(asset_name='Laptop charger and carry bag', barcode='N1',
+                             asset_value='1', location='', assign_to=user)
+
+        assets = search_assets('laptop', limit=2, queryset=Asset.objects.filter(
+            assign_to__station__station_name='North'))
+        self.assertEqual([asset.barcode for asset in assets], ['N1'])
+
+        response = self.client.get('/productlist', {'filter': 'North', 'q': 'laptop'})
+        self.assertEqual([asset.barcode for asset in response.context['asset']], ['N1'])
+
+
+@override_settings(AUTOCOMPLETE_REFRESH_SECONDS=3600)
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        reset_index()
+        self.addCleanup(reset_index)
+        self.asset = Asset.objects.create(
+            asset_name='Dell Latitude', barcode='DL1', asset_value='100', location='')
+        Asset.objects.create(asset_name='Desk', barcode='DK1', asset_value='10', location='')
+
+    def complete(self, query):
+        response = self.client.get('/api/autocomplete/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [asset['barcode'] for asset in response.json()]
+
+    def test_prefix_matches_from_memory(self):
+        self.assertEqual(self.complete('lat'), ['DL1'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('d'), ['DL1', 'DK1'])
+            self.assertEqual(self.complete('dk'), ['DK1'])
+            self.assertEqual(self.complete('x'), [])
+
+    def test_max_entries_bounds_every_key(self):
+        index = PrefixIndex(max_entries=5)
+        with self.assertLogs('app.autocomplete', level='WARNING'):
+            index.load([(1, 'A1', 'Dell Latitude'), (2, 'A2', 'Desk'), (3, 'A3', 'Chair')])
+        # Both assets' barcodes and names fit, one name word did too
+        self.assertEqual(len(index), 5)
+        self.assertEqual(set(index.assets), {1, 2})
+        with self.assertLogs('app.autocomplete', level='WARNING'):
+            index.add(4, 'A4', 'Lamp')
+        self.assertEqual((len(index), set(index.assets)), (5, {1, 2}))
+        self.assertEqual([asset['barcode'] for asset in index.search('lat')], ['A1'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.complete('d')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.asset.asset_name = 'HP Elitebook'
+            self.asset.save()
+        self.assertEqual(self.complete('lat'), [])
+        self.assertEqual(self.complete('elite'), ['DL1'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.asset.delete()
+        self.assertEqual(self.complete('hp'), [])
+
+    def test_bulk_writes_applied_from_change_log(self):
+        self.complete('d')
+        Asset.objects.filter(pk=self.asset.pk).update(asset_name='Lenovo Thinkpad')
+        log_changes(Asset, [self.asset.pk])
+        with self.settings(AUTOCOMPLETE_REFRESH_SECONDS=0):
+            self.assertEqual(self.complete('think'), ['DL1'])
+            self.assertEqual(self.complete('dell'), [])
+
+
+class BarcodeLookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.asset = Asset.objects.create(
+            asset_name='Dell Latitude', barcode='DL1', asset_value='100', location='')
+        Asset.objects.create(asset_name='Desk', barcode='DK1', asset_value='10', location='')
+
+    def lookup(self, barcodes):
+        response = self.client.post('/api/products/lookup/?fields=barcode,asset_name',
+                                    {'barcodes': barcodes}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_bulk_lookup_in_request_order(self):
+        data = self.lookup(['DK1', 'NOPE', 'DL1', 'DK1'])
+        self.assertEqual(data['products'], [{'barcode': 'DK1', 'asset_name': 'Desk'},
+                                            {'barcode': 'DL1', 'asset_name': 'Dell Latitude'}])
+        self.assertEqual(data['missing'], ['NOPE'])
+
+        response = self.client.post('/api/products/lookup/', {'barcodes': 'DK1'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_until_asset_saved(self):
+        self.client.get('/api/products/DL1/')
+        with self.assertNumQueries(1):
+            # Only the table versions are read
+            response = self.client.get('/api/products/DL1/')
+        self.assertEqual(response.json()['asset_name'], 'Dell Latitude')
+
+        self.asset.asset_name = 'HP Elitebook'
+        self.asset.save()
+        self.assertEqual(self.client.get('/api/products/DL1/').json()['asset_name'], 'HP Elitebook')
+
+        Asset.objects.filter(pk=self.asset.pk).set_status('in-use')
+        self.assertEqual(self.lookup(['DL1'])['products'][0]['asset_name'], 'HP Elitebook')
+        self.assertEqual(self.client.get('/api/products/DL1/').json()['asset_status'], 'in-use')
+
+
+class BulkAssignTests(TestCase):
+    def setUp(self):
+        station = stationDetails.objects.create(
+            station_id=1, station_name='Central', station_code='C', station_address='HQ')
+        self.user = UserDetails.objects.create(
+            user_id=1, username='crew', password='x', first_name='C', last_name='W',
+            role=role.objects.create(role_id=1, role='staff'), station=station)
+        for barcode in ['K1', 'K2']:
+            Asset.objects.create(asset_name=barcode, barcode=barcode, asset_value='1', location='')
+        Asset.objects.create(asset_name='Taken', barcode='K3', asset_value='1', location='',
+                             assign_to=self.user, asset_status='in-use')
+
+    def assign(self, barcodes, username='crew'):
+        return self.client.post('/api/assign_products/', {
+            'barcodes': barcodes, 'username': username,
+            'return_date': '2030-01-01', 'location': 'unknown',
+        }, content_type='application/json')
+
+    def test_assigns_free_assets_and_reports_the_rest(self):
+        response = self.assign(['K1', 'K2', 'K3', 'NOPE'])
+        self.assertEqual(response.status_code, 200)
+        statuses = {result['barcode']: result['status'] for result in response.json()['results']}
+        self.assertEqual(statuses, {'K1': 'assigned', 'K2': 'assigned',
+                                    'K3': 'already-assigned', 'NOPE': 'not-found'})
+        self.assertEqual(Allocation.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(set(Asset.objects.filter(assign_to=self.user, asset_status='in-use')
+                             .values_list('barcode', flat=True)), {'K1', 'K2', 'K3'})
+        self.assertEqual(get_counters()['user'][str(self.user.pk)], 3)
+        self.assertEqual(counter_drift(), {})
+
+    def test_unknown_user(self):
+        self.assertEqual(self.assign(['K1'], username='nobody').status_code, 404)
+        self.assertFalse(Allocation.objects.exists())
+
+
+@override_settings(GEOCODER_CACHE=None, GEOCODER_BACKENDS=[{
+    'BACKEND': 'app.geocoding.StaticGeocoder',
+    'OPTIONS': {
+        'addresses': {'18.5,73.8': {'road': 'FC Road', 'state_district': None, 'city_district': 'Pune'}},
+    },
+}])
+class AddProductTests(TestCase):
+    def add(self, location):
+        AssetSubCategory.objects.get_or_create(sub_category_name='Laptop')
+        return self.client.post('/api/add_product/', {
+            'barcode': 'AP1', 'asset_name': 'Laptop', 'category': 'IT', 'subcategory': 'Laptop',
+            'purchase_date': '2024-01-01', 'asset_value': '100', 'condition': 'good',
+            'location': location,
+        }, content_type='application/json')
+
+    def test_partial_address(self):
+        response = self.add('18.5,73.8')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Asset.objects.get(barcode='AP1').location, 'FC Road, Pune')
+
+    def test_unresolved_location(self):
+        with self.assertLogs('app.views', level='WARNING'):
+            self.assertEqual(self.add('1.0,2.0').status_code, 400)
+        self.assertFalse(Asset.objects.exists())
+
+
+class ForecastTests(TestCase):
+    def add_history(self, asset, start, days):
+        # bulk_create sends no signals, like generate_stock_data.py
+        StockHistory.objects.bulk_create([
+            StockHistory(asset=asset, date=start + timedelta(days=i), stock_level=50 + i % 7)
+            for i in range(days)
+        ])
+
+    def test_stored_forecast_follows_bulk_loaded_history(self):
+        asset = Asset.objects.create(asset_name='Toner', barcode='T1', asset_value='1', location='')
+        start = timezone.now().date() - timedelta(days=40)
+        self.add_history(asset, start, 20)
+        forecast = get_forecast(asset.pk)
+        self.assertEqual(forecast[0][0], start + timedelta(days=20))
+        self.assertEqual(StockForecast.objects.filter(asset=asset).count(), FORECAST_DAYS)
+
+        self.add_history(asset, start + timedelta(days=20), 10)
+        forecast = get_forecast(asset.pk)
+        self.assertEqual(forecast[0][0], start + timedelta(days=30))
+
+    def test_batch_forecast_in_a_process_pool(self):
+        start = timezone.now().date() - timedelta(days=40)
+        assets = [Asset.objects.create(asset_name=f'Toner {i}', barcode=f'T{i}', asset_value='1',
+                                       location='') for i in range(3)]
+        self.add_history(assets[0], start, 20)
+        self.add_history(assets[1], start, 25)
+        self.add_history(assets[2], start, 5)
+
+        result = run_batch_forecast(workers=2)
+        self.assertEqual((result['assets'], result['succeeded']), (3, 2))
+        self.assertEqual(result['failures'], {assets[2].pk: "Not enough stock history for prediction"})
+
+        stored = StockForecast.objects.filter(asset__in=assets[:2]).order_by('asset_id', 'forecast_date')
+        self.assertEqual(stored.count(), 2 * FORECAST_DAYS)
+        self.assertFalse(StockForecast.objects.filter(asset=assets[2]).exists())
+        first = stored.filter(asset=assets[1]).first()
+        self.assertEqual(first.forecast_date, start + timedelta(days=25))
+        self.assertEqual(first.history_fingerprint, history_fingerprint(assets[1].pk)[1])
+
+        # Served from the stored rows without another fit
+        with mock.patch('app.forecasting.fit_forecast') as fit:
+            get_forecast(assets[0].pk)
+        fit.assert_not_called()
+
+
+class ImportQueueTests(TestCase):
+    def setUp(self):
+        upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(upload_dir.cleanup)
+        self.enterContext(override_settings(IMPORT_UPLOAD_DIR=upload_dir.name, IMPORT_RETRY_DELAY=30))
+
+    def enqueue(self, content):
+        return enqueue_import(SimpleUploadedFile('products.csv', content.encode()))
+
+    def test_enqueue_claim_and_run(self):
+        job = self.enqueue(CSV_HEADER + "Laptop,Q1,100,good,IT,Laptops,2024-01-01\n")
+        self.assertEqual(job.status, 'queued')
+
+        claimed = claim_next_job('worker-1')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, 'running', 1))
+        self.assertIsNone(claim_next_job('worker-2'))
+
+        run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_imported), ('completed', 1))
+        self.assertTrue(Asset.objects.filter(barcode='Q1').exists())
+
+    def test_failure_is_retried_then_terminal(self):
+        job = self.enqueue(CSV_HEADER)
+        ImportJob.objects.filter(pk=job.pk).update(file_path='missing.csv', max_attempts=2)
+
+        run_job(claim_next_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.available_at, timezone.now())
+        # Not runnable until the retry delay has passed
+        self.assertIsNone(claim_next_job('worker-1'))
+
+        ImportJob.objects.filter(pk=job.pk).update(available_at=timezone.now())
+        run_job(claim_next_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIn('Traceback', job.error)
+        self.assertIsNone(claim_next_job('worker-1'))
+
+    def test_stale_running_job_respects_max_attempts(self):
+        job = self.enqueue(CSV_HEADER)
+        claim_next_job('worker-1')
+        stale = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_TIMEOUT + 1)
+        ImportJob.objects.filter(pk=job.pk).update(started_at=stale)
+
+        # The worker died: the job is taken over while attempts remain
+        self.assertEqual(claim_next_job('worker-2').attempts, 2)
+        ImportJob.objects.filter(pk=job.pk).update(started_at=stale, attempts=job.max_attempts)
+        self.assertIsNone(claim_next_job('worker-3'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+
+class GeocoderTests(TestCase):
+    def write_csv(self, rows):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'gazetteer.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("lat,lon,road,state_district,city_district\n" + ''.join(rows))
+        return path
+
+    def test_gazetteer_returns_the_nearest_place_in_range(self):
+        gazetteer = GazetteerGeocoder(self.write_csv([
+            "18.5204,73.8567,FC Road,Pune,Shivajinagar\n",
+            "18.5300,73.8470,JM Road,Pune,\n",
+            "19.0760,72.8777,Marine Drive,Mumbai,Colaba\n",
+        ]), max_distance_km=2)
+        self.assertEqual(gazetteer.reverse(18.5210, 73.8560)['road'], 'FC Road')
+        self.assertEqual(gazetteer.reverse(18.5299, 73.8471),
+                         {'road': 'JM Road', 'state_district': 'Pune', 'city_district': None})
+        self.assertEqual(gazetteer.reverse(19.07, 72.88)['road'], 'Marine Drive')
+        # Nearest place is about 30 km away
+        self.assertIsNone(gazetteer.reverse(18.8, 73.8))
+
+    def test_build_gazetteer_from_the_geocode_cache(self):
+        GeocodeCache.objects.create(key='18.5204,73.8567', address={'road': 'FC Road', 'country': 'India'})
+        GeocodeCache.objects.create(key='18.0000,73.0000', address={'country': 'India'})
+        extra = self.write_csv(["19.0760,72.8777,Marine Drive,Mumbai,Colaba\n"])
+        path = os.path.join(os.path.dirname(extra), 'built', 'gazetteer.csv')
+
+        self.assertEqual(build_gazetteer(path, [extra]), 2)
+        gazetteer = GazetteerGeocoder(path)
+        self.assertEqual(gazetteer.reverse(18.5204, 73.8567)['road'], 'FC Road')
+        self.assertEqual(gazetteer.reverse(19.0760, 72.8777)['city_district'], 'Colaba')
+
+    def test_chain_falls_through_to_the_next_backend(self):
+        class Broken:
+            def reverse(self, latitude, longitude):
+                raise OSError("offline")
+
+        address = {'road': 'FC Road'}
+        chain = ChainGeocoder([Broken(), StaticGeocoder(), StaticGeocoder(default=address)])
+        with self.assertLogs('app.geocoding', level='ERROR'):
+            self.assertEqual(chain.reverse(18.5, 73.8), address)
+        with self.assertRaises(GeocoderError), self.assertLogs('app.geocoding', level='ERROR'):
+            ChainGeocoder([Broken(), StaticGeocoder()]).reverse(18.5, 73.8)
+
+    def test_cache_quantizes_coordinates(self):
+        backend = StaticGeocoder(default={'road': 'FC Road'})
+        geocoder = CachedGeocoder(backend, precision=4)
+        self.assertEqual(geocoder.quantize(18.52041, 73.85672), '18.5204,73.8567')
+
+        geocoder.reverse(18.52041, 73.85672)
+        backend.default = {'road': 'Changed'}
+        # Within the same cell: answered from memory without asking the backend
+        self.assertEqual(geocoder.reverse(18.52039, 73.85668), {'road': 'FC Road'})
+        self.assertEqual(geocoder.stats, {'memory_hits': 1, 'db_hits': 0, 'misses': 1})
+
+    def test_lru_eviction_and_database_fallback(self):
+        geocoder = CachedGeocoder(StaticGeocoder(default={'road': 'FC Road'}), max_entries=2)
+        for latitude in (1, 2, 3):
+            geocoder.reverse(latitude, 0)
+        self.assertEqual(list(geocoder.entries), ['2.0000,0.0000', '3.0000,0.0000'])
+        self.assertEqual(GeocodeCache.objects.count(), 3)
+
+        # Evicted from memory, still stored in GeocodeCache
+        geocoder.reverse(1, 0)
+        self.assertEqual(geocoder.stats, {'memory_hits': 0, 'db_hits': 1, 'misses': 3})
+        self.assertEqual(list(geocoder.entries), ['3.0000,0.0000', '1.0000,0.0000'])
+
+        # Another process starts with an empty memory cache
+        other = CachedGeocoder(StaticGeocoder())
+        self.assertEqual(other.reverse(2, 0), {'road': 'FC Road'})
+        self.assertEqual(other.stats['db_hits'], 1)
+
+
+class ImportTests(TestCase):
+    def frame(self, content):
+        return pd.read_csv(io.StringIO(CSV_HEADER + content))
+
+    def test_rejected_rows_report_their_reason(self):
+        report = import_assets(self.frame(
+            "Laptop,I1,100,good,IT,Laptops,2024-01-01\n"
+            "Mouse,I2,,good,IT,Mice,2024-01-01\n"
+            "Cable,I3,5,good,IT,Cables,01/02/2024\n"
+            "Laptop,I1,120,fair,IT,Laptops,2024-01-01\n"))
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['rejected'], [
+            {'row': 2, 'barcode': 'I1', 'reason': "Duplicate barcode later in file"},
+            {'row': 3, 'barcode': 'I2', 'reason': "Missing required fields"},
+            {'row': 4, 'barcode': 'I3', 'reason': "Invalid date format"},
+        ])
+        self.assertEqual(Asset.objects.get(barcode='I1').asset_value, '120')
+
+    def test_upsert_keeps_status_and_creates_categories(self):
+        import_assets(self.frame("Laptop,I1,100,good,IT,Laptops,2024-01-01\n"))
+        laptops = AssetSubCategory.objects.get(sub_category_name='Laptops')
+        self.assertEqual(laptops.category.category_name, 'IT')
+        Asset.objects.filter(barcode='I1').set_status('in-use')
+
+        report = import_assets(self.frame(
+            "Laptop Pro,I1,150,fair,IT,Laptops,2024-02-01\n"
+            "Chair,I2,20,good,Furniture,Chairs,2024-02-01\n"))
+        self.assertEqual(report, {'imported': 2, 'rejected': []})
+        asset = Asset.objects.get(barcode='I1')
+        self.assertEqual((asset.asset_name, asset.asset_value, asset.condition, asset.asset_status),
+                         ('Laptop Pro', '150', 'fair', 'in-use'))
+        self.assertEqual(AssetSubCategory.objects.filter(sub_category_name='Laptops').count(), 1)
+        self.assertEqual(Asset.objects.get(barcode='I2').asset_category.category.category_name,
+                         'Furniture')
+        self.assertEqual(counter_drift(), {})
+
+    def test_chunked_import_matches_single_shot(self):
+        content = CSV_HEADER + ''.join(
+            f"Item {i},C{i},{i},{'good' if i % 2 else 'fair'},Cat {i % 2},Sub {i % 3},2024-01-01\n"
+            for i in range(7)) + "Broken,C99,,good,Cat 0,Sub 0,2024-01-01\n"
+
+        def snapshot():
+            assets = set(Asset.objects.values_list(
+                'barcode', 'asset_name', 'asset_value', 'condition', 'asset_category__sub_category_name'))
+            counters = {(dimension, key): count for dimension, keys in get_counters().items()
+                        for key, count in keys.items() if count}
+            return assets, counters
+
+        job = ImportJob.objects.create(file_name='products.csv', status='running')
+        import_stream(job, io.StringIO(content), chunk_size=3)
+        self.assertEqual((job.status, job.rows_processed, job.rows_imported, job.rows_rejected),
+                         ('completed', 8, 7, 1))
+        self.assertEqual(job.rejected, [{'row': 9, 'barcode': 'C99', 'reason': "Missing required fields"}])
+        chunked = snapshot()
+
+        Asset.objects.all().delete()
+        report = import_assets(pd.read_csv(io.StringIO(content)))
+        self.assertEqual((report['imported'], len(report['rejected'])), (7, 1))
+        self.assertEqual(snapshot(), chunked)
+        self.assertEqual(chunked[1][('total', '')], 7)
+        self.assertEqual(counter_drift(), {})
+
+
+class PaginationTests(TestCase):
+    def add_asset(self, i):
+        return Asset.objects.create(asset_name=f'Item {i}', barcode=f'P{i}', asset_value='1', location='')
+
+    def barcodes(self, data):
+        return [asset['barcode'] for asset in data['results']]
+
+    def test_cursor_is_stable_across_writes(self):
+        first = [self.add_asset(i) for i in range(5)][0]
+        page = self.client.get('/api/asset/', {'page_size': 2}).json()
+        self.assertEqual(self.barcodes(page), ['P0', 'P1'])
+
+        # Rows removed before the cursor or added after it shift nothing
+        first.delete()
+        self.add_asset(5)
+        page = self.client.get(page['next']).json()
+        self.assertEqual(self.barcodes(page), ['P2', 'P3'])
+        page = self.client.get(page['next']).json()
+        self.assertEqual(self.barcodes(page), ['P4', 'P5'])
+        self.assertIsNone(page['next'])
+
+    def test_full_list_without_paging_parameters(self):
+        for i in range(3):
+            self.add_asset(i)
+        data = self.client.get('/api/asset/').json()
+        self.assertEqual([asset['barcode'] for asset in data], ['P0', 'P1', 'P2'])
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        Asset.objects.create(asset_name='Laptop', barcode='S1', asset_value='1', location='')
+        Asset.objects.create(asset_name='Desk', barcode='S2', asset_value='1', location='')
+
+    def test_selected_fields(self):
+        data = self.client.get('/api/asset/', {'fields': 'barcode,asset_name'}).json()
+        self.assertEqual(data, [{'asset_name': 'Laptop', 'barcode': 'S1'},
+                                {'asset_name': 'Desk', 'barcode': 'S2'}])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/asset/', {'fields': 'barcode,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['fields'][0])
+        self.assertEqual(self.client.get('/api/products/S1/', {'fields': 'nope'}).status_code, 400)
+
+    def test_compact_rows(self):
+        data = self.client.get('/api/asset/', {'fields': 'barcode,assign_to', 'compact': '1'}).json()
+        self.assertEqual(data, {'fields': ['barcode', 'assign_to'],
+                                'rows': [['S1', None], ['S2', None]]})
+
+        data = self.client.get('/api/asset/', {'fields': 'barcode', 'compact': '1', 'page_size': 1}).json()
+        self.assertEqual(data['rows'], [['S1']])
+        self.assertEqual(self.client.get(data['next']).json()['rows'], [['S2']])
+
+
+class MessagePackTests(TestCase):
+    def test_round_trip(self):
+        Asset.objects.create(asset_name='Laptop', barcode='M1', asset_value='1', location='',
+                             purchase_date='2024-01-01')
+        response = self.client.post(
+            '/api/products/lookup/?fields=barcode,purchase_date',
+            msgpack.packb({'barcodes': ['M1', 'M2']}), content_type=MSGPACK_MEDIA_TYPE,
+            HTTP_ACCEPT=MSGPACK_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], MSGPACK_MEDIA_TYPE)
+        # Dates travel as the same strings JSON clients get
+        self.assertEqual(msgpack.unpackb(response.content), {
+            'products': [{'barcode': 'M1', 'purchase_date': '2024-01-01'}], 'missing': ['M2']})
+
+    def test_invalid_body(self):
+        response = self.client.post('/api/products/lookup/', b'\xc1', content_type=MSGPACK_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('MessagePack parse error', response.json()['detail'])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        sub_category = AssetSubCategory.objects.create(
+            sub_category_name='Laptops', category=AssetCategory.objects.create(category_name='IT'))
+        for i in range(5):
+            Asset.objects.create(asset_name=f'Item {i}', barcode=f'E{i}', asset_value=str(i),
+                                 location='', purchase_date='2024-01-01',
+                                 asset_category=sub_category if i % 2 else None)
+
+    def test_products_csv(self):
+        response = self.client.get('/export-products/')
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], PRODUCT_EXPORT_HEADER)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1], ['Item 0', 'E0', '', '', '2024-01-01', '0', 'good'])
+        self.assertEqual(rows[2], ['Item 1', 'E1', 'IT', 'Laptops', '2024-01-01', '1', 'good'])
+
+    def test_inventory_workbook_splits_full_sheets(self):
+        # Header plus two rows per sheet
+        with mock.patch('app.exports.MAX_SHEET_ROWS', 3):
+            response = self.client.get('/export-inventory-excel/')
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        self.assertEqual(workbook.sheetnames, ['Assets', 'Assets (2)', 'Assets (3)',
+                                               'Allocations', 'Maintenance', 'Stock History'])
+        sheets = {name: list(workbook[name].iter_rows(values_only=True)) for name in workbook.sheetnames}
+        for name in ['Assets', 'Assets (2)', 'Assets (3)']:
+            self.assertEqual(sheets[name][0], tuple(INVENTORY_SHEETS[0][1]))
+        self.assertEqual([len(sheets[name]) for name in ['Assets', 'Assets (2)', 'Assets (3)']],
+                         [3, 3, 2])
+        barcodes = [row[2] for name in ['Assets', 'Assets (2)', 'Assets (3)'] for row in sheets[name][1:]]
+        self.assertEqual(barcodes, ['E0', 'E1', 'E2', 'E3', 'E4'])
+        self.assertEqual(len(sheets['Allocations']), 1)
+        workbook.close()
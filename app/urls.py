@@ -32,17 +32,22 @@ urlpatterns = [
     path('api/totals/', views.get_totals, name='get_totals'),
     path('api/user/totals/', views.get_user_totals, name='get_user_totals'),
     path('api/assign_product/', views.assign_product, name='assignProduct'),
+    path('api/assign_products/', views.assign_products, name='assignProducts'),
     path('api/asset/', views.AssetListView, name='asset-list'),
     path('api/user/asset/', views.UserAssetListView, name='user-asset-list'),
     path('api/products/by-subcategory', views.AssetListView, name='asset_list'),
     path('api/categories/<int:id>/',
          views.SubcategoryListAPIView, name='subcategory_list'),
+    path('api/products/lookup/', views.lookup_products, name='lookup_products'),
     path('api/products/<str:barcode>/', views.get_product_by_barcode,
          name='get_product_by_barcode'),  # Update this line
     # path('api/assets/', views.AssetList, name='asset-list'),
     path('api/update-barcode/<str:asset_id>/',
          views.update_barcode, name='update-barcode'),
     path('api/requests/', views.get_requests, name='get_requests'),
+    path('api/sync/', views.sync_changes, name='sync_changes'),
+    path('api/search/', views.search_products, name='search_products'),
+    path('api/autocomplete/', views.autocomplete_products, name='autocomplete_products'),
 
 
     path('', views.signin, name='signin'),
@@ -129,6 +134,11 @@ urlpatterns = [
          name='import_products_html'),
     path('import-products/', views.import_products, name='import_products'),
     path('export-products/', views.export_products, name='export_products'),
+    path('export-inventory-excel/', views.export_inventory_excel,
+         name='export_inventory_excel'),
+    path('api/import-jobs/', views.import_job_list, name='import_job_list'),
+    path('api/import-jobs/<int:job_id>/', views.import_job_status,
+         name='import_job_status'),
 
 
     # delete products
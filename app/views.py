@@ -21,12 +21,13 @@ from datetime import datetime
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.serializers.json import DjangoJSONEncoder
-from geopy.geocoders import Nominatim
 from django.db.models import Count
 import json
 import csv
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.core.files.storage import FileSystemStorage
+from django.conf import settings
+from django.urls import reverse
 import pandas as pd
 from django.db import transaction
 from django.contrib.auth.models import User
@@ -39,7 +40,6 @@ import numpy as np
 import logging
 from django.http import JsonResponse
 from django.shortcuts import render
-from statsmodels.tsa.arima.model import ARIMA
 from .models import StockHistory, Asset
 from openpyxl import Workbook
 from reportlab.pdfgen import canvas
@@ -54,12 +54,12 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import login as django_login
 from django.contrib.auth import login as django_login
-from .serializers import ProductSerializer, LoginSerializer, AssignSerializer, AssetSerializer, UserSerializer, BarcodeUpdateSerializer, RequestAssetSerializer, SubcategorySerializer, AllocationSerializer
+from .serializers import ProductSerializer, LoginSerializer, AssignSerializer, BulkAssignSerializer, AssetSerializer, UserSerializer, BarcodeUpdateSerializer, RequestAssetSerializer, SubcategorySerializer, AllocationSerializer, ImportJobSerializer, ImportJobDetailSerializer
 from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.serializers.json import DjangoJSONEncoder
-from geopy.geocoders import Nominatim
+from .geocoding import GeocoderError, format_address, reverse_geocode
 from django.db.models import Count
 import json
 from datetime import date
@@ -69,8 +69,20 @@ import numpy as np
 import logging
 from django.http import JsonResponse
 from django.shortcuts import render
-from statsmodels.tsa.arima.model import ARIMA
 from .models import StockHistory, Asset
+from .forecasting import ForecastError, get_forecast, load_history
+from .importers import enqueue_import, import_assets, import_stream
+from .exports import stream_products_csv, write_inventory_workbook
+from .pagination import paginated_response
+from .changes import changes_since, log_changes, versioned_etag
+from .categories import get_category_tree, get_subcategories
+from .dashboard import get_dashboard_stats, get_user_asset_count
+from .counters import get_counter
+from .autocomplete import AUTOCOMPLETE_LIMIT, autocomplete
+from .lookups import MAX_LOOKUP_BARCODES, lookup_barcodes
+from .search import MAX_SEARCH_LIMIT, SEARCH_LIMIT, search_assets
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from openpyxl import Workbook
 from reportlab.pdfgen import canvas
 import google.generativeai as genai
@@ -79,76 +91,19 @@ from django.http import JsonResponse
 from dotenv import load_dotenv
 import os
 
-
-def export_stock_to_excel(request, asset_id):
-    try:
-        asset = Asset.objects.get(asset_id=asset_id)
-        stock_data = StockHistory.objects.filter(asset=asset).order_by('date')
-
-        if not stock_data.exists():
-            return JsonResponse({"error": "No stock history available"}, status=404)
-
-        df = pd.DataFrame.from_records(
-            stock_data.values('date', 'stock_level'))
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-
-        if len(df) < 10:
-            return JsonResponse({"error": "Not enough stock history for prediction"}, status=404)
-
-        # 🔹 Train ARIMA model
-        model = ARIMA(df['stock_level'], order=(2, 1, 2))
-        model_fit = model.fit()
-        forecast = model_fit.forecast(steps=30)
-        forecast_dates = [df.index[-1] +
-                          timedelta(days=i) for i in range(1, 31)]
-
-        # 🔹 Prepare Data for Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = f"{asset.asset_name} Prediction"
-
-        # 🔹 Add Headers
-        ws.append(["Date", "Predicted Stock Level"])
-
-        # 🔹 Add Forecast Data
-        for date, stock in zip(forecast_dates, forecast):
-            ws.append([date.strftime('%Y-%m-%d'), int(np.round(stock))])
-
-        # 🔹 Create Response for Excel File
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        response["Content-Disposition"] = f'attachment; filename="Stock_Prediction_{asset.asset_name}.xlsx"'
-        wb.save(response)
-        return response
-
-    except Asset.DoesNotExist:
-        return JsonResponse({"error": "Asset not found"}, status=404)
+logger = logging.getLogger(__name__)
 
 
 # 🔹 Export Stock Predictions to PDF
 def export_stock_to_pdf(request, asset_id):
     try:
         asset = Asset.objects.get(asset_id=asset_id)
-        stock_data = StockHistory.objects.filter(asset=asset).order_by('date')
 
-        if not stock_data.exists():
-            return JsonResponse({"error": "No stock history available"}, status=404)
-
-        df = pd.DataFrame.from_records(
-            stock_data.values('date', 'stock_level'))
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-
-        if len(df) < 10:
-            return JsonResponse({"error": "Not enough stock history for prediction"}, status=404)
-
-        # 🔹 Train ARIMA model
-        model = ARIMA(df['stock_level'], order=(2, 1, 2))
-        model_fit = model.fit()
-        forecast = model_fit.forecast(steps=30)
-        forecast_dates = [df.index[-1] +
-                          timedelta(days=i) for i in range(1, 31)]
+        # 🔹 Reuse the cached ARIMA forecast while the history is unchanged
+        try:
+            forecast = get_forecast(asset.asset_id)
+        except ForecastError as e:
+            return JsonResponse({"error": str(e)}, status=404)
 
         # 🔹 Create PDF Response
         response = HttpResponse(content_type="application/pdf")
@@ -163,10 +118,10 @@ def export_stock_to_pdf(request, asset_id):
         p.setFont("Helvetica", 10)
 
         # 🔹 Add Forecast Data
-        for date, stock in zip(forecast_dates, forecast):
+        for date, stock in forecast:
             y_position -= 20
             p.drawString(
-                100, y_position, f"{date.strftime('%Y-%m-%d')} - {int(np.round(stock))}")
+                100, y_position, f"{date.strftime('%Y-%m-%d')} - {stock}")
 
         p.showPage()
         p.save()
@@ -186,41 +141,27 @@ def stock_prediction_page(request):
 def stock_history_and_prediction(request, asset_id):
     try:
         asset = Asset.objects.get(asset_id=asset_id)
-        stock_data = StockHistory.objects.filter(asset=asset).order_by('date')
+        history = load_history(asset.asset_id)
 
-        if not stock_data.exists():
-            return JsonResponse({"error": "No stock history available"}, status=404)
-
-        # Convert stock history to DataFrame
-        df = pd.DataFrame.from_records(
-            stock_data.values('date', 'stock_level'))
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-
-        if len(df) < 10:
-            return JsonResponse({"error": "Not enough stock history for prediction"}, status=404)
-
-        # 🔹 Fit ARIMA model
+        # 🔹 Fit ARIMA model (or reuse the cached fit for this history)
         try:
-            model = ARIMA(df['stock_level'], order=(2, 1, 2))
-            model_fit = model.fit()
-            forecast = model_fit.forecast(steps=30)
-            forecast_dates = [df.index[-1] +
-                              timedelta(days=i) for i in range(1, 31)]
-
-            # 🔹 Format data for JSON response
-            past_stock = [{"date": str(index.date()), "stock_level": row}
-                          for index, row in df['stock_level'].items()]
-            predicted_stock = [{"date": str(date.date()), "stock_level": int(
-                np.round(value))} for date, value in zip(forecast_dates, forecast)]
-
-            return JsonResponse({
-                "asset": asset.asset_name,
-                "past_stock": past_stock,
-                "predicted_stock": predicted_stock
-            })
+            forecast = get_forecast(asset.asset_id, history=history)
+        except ForecastError as e:
+            return JsonResponse({"error": str(e)}, status=404)
         except Exception as e:
             return JsonResponse({"error": f"ARIMA model error: {str(e)}"}, status=500)
+
+        # 🔹 Format data for JSON response
+        past_stock = [{"date": str(index.date()), "stock_level": int(level)}
+                      for index, level in history.items()]
+        predicted_stock = [{"date": str(date), "stock_level": stock}
+                           for date, stock in forecast]
+
+        return JsonResponse({
+            "asset": asset.asset_name,
+            "past_stock": past_stock,
+            "predicted_stock": predicted_stock
+        })
     except Asset.DoesNotExist:
         return JsonResponse({"error": "Asset not found"}, status=404)
 
@@ -254,7 +195,7 @@ def login_view(request):
 
             if user.password == password:
                 user.last_login = timezone.now()
-                user.save()  # Save the updated last_login time
+                user.save(update_fields=['last_login'])  # Save the updated last_login time
 
                 # request.session['user_id'] = user.user_id
                 request.session['username'] = user.username
@@ -281,24 +222,12 @@ def login_view(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Polled endpoints answer 304 Not Modified while the tables they read are unchanged
+@vary_on_headers('Accept')
+@condition(etag_func=versioned_etag(AssetCategory, AssetSubCategory))
 @api_view(['GET'])
 def get_categories(request):
-    categories = AssetCategory.objects.all()
-    data = []
-    for category in categories:
-        subcategories = AssetSubCategory.objects.filter(category=category)
-        data.append({
-            "category_id": category.category_id,
-            "category_name": category.category_name,
-            "subcategories": [
-                {
-                    "sub_category_id": sub.sub_category_id,
-                    "sub_category_name": sub.sub_category_name
-                }
-                for sub in subcategories
-            ]
-        })
-    return Response(data, status=200)
+    return Response(get_category_tree(), status=200)
 
 
 @api_view(['GET'])
@@ -330,19 +259,9 @@ def add_product(request):
         subcategory = serializer.validated_data['subcategory']
         print(location)
         # Convert location coordinates into a readable name
-        try:
-            latitude, longitude = map(float, location.split(','))
-            geolocator = Nominatim(user_agent="asset_management")
-            location_name = geolocator.reverse(
-                (latitude, longitude)).raw['address']
-            print(location_name)
-            road_name = location_name.get('road')
-            city_name = location_name.get('state_district')
-            district_name = location_name.get('city_district')
-            specific_area_name = road_name + ', ' + city_name + ', ' + district_name
-            print(specific_area_name)
-        except Exception as e:
-            return Response({"error": f"Failed to resolve location name: {str(e)}"}, status=400)
+        specific_area_name = location_name(location)
+        if specific_area_name is None:
+            return Response({"error": "Failed to resolve location name"}, status=400)
 
         # Get the AssetSubCategory instance based on the provided subcategory_id
         try:
@@ -379,10 +298,11 @@ def add_product(request):
 @api_view(['GET'])
 def user_list_view(request):
     users = UserDetails.objects.all()  # Get all users
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginated_response(request, users, UserSerializer, ordering='user_id')
 
 
+@vary_on_headers('Accept')
+@condition(etag_func=versioned_etag(Asset, AssetCategory, AssetSubCategory, UserDetails))
 @api_view(['GET'])
 def AssetListView(request):
     filter_type = request.query_params.get('filter')
@@ -403,8 +323,14 @@ def AssetListView(request):
     else:
         assets = Asset.objects.all()
 
-    serializer = AssetSerializer(assets, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    response = paginated_response(request, assets, AssetSerializer, ordering='asset_id')
+    # Total matching rows from the inventory counters, without a COUNT(*)
+    if filter_type in dict(ASSET_STATUS_CHOICES):
+        response['X-Total-Count'] = get_counter('status', filter_type)
+    elif filter_type != 'barcode-remaining':
+        response['X-Total-Count'] = get_counter(
+            'subcategory', subcategory) if subcategory else get_counter('total', '')
+    return response
 
 
 @api_view(['GET'])
@@ -426,14 +352,13 @@ def UserAssetListView(request):
                 expected_return_date__gte=today,
                 expected_return_date__lte=next_seven_days
             )
-            serializer = AllocationSerializer(products, many=True)
-            print(serializer.data)
+            return paginated_response(request, products, AllocationSerializer, ordering='allocation_id')
         elif filter == 'Returned':
-            products = ReturnedProducts.objects.filter(user__username=username)
-            serializer = AssetSerializer(products, many=True)
+            # Serialize the returned assets themselves, not the return records
+            products = Asset.objects.filter(
+                returnedproducts__user__username=username).distinct()
         else:
             products = Asset.objects.filter(assign_to__username=username)
-            serializer = AssetSerializer(products, many=True)
     else:
         return Response(
             {"detail": "Username query parameter is required."},
@@ -441,43 +366,28 @@ def UserAssetListView(request):
         )
 
     # Return the serialized data as a response
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginated_response(request, products, AssetSerializer, ordering='asset_id')
 
 
 @api_view(['GET'])
 def SubcategoryListAPIView(request, id):
     print(id)  # To ensure the ID is passed correctly
-    subcategories = AssetSubCategory.objects.filter(category__category_id=id)
-    serializer = SubcategorySerializer(subcategories, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(get_subcategories(id), status=status.HTTP_200_OK)
 
 
 def index(request):
-    userCount = UserDetails.objects.count()
-    assetCount = Asset.objects.count()
-    availableAsset = Asset.objects.filter(assign_to__isnull=True).count()
-    inUseAsset = Asset.objects.filter(assign_to__isnull=False).count()
-
-    condition_queryset = Asset.objects.values(
-        'condition').annotate(total=Count('asset_id')).order_by()
-    condition_data = list(condition_queryset)
-
-    stations_data = (
-        # Replace "station_name" with the actual field in UserDetails
-        Asset.objects.values("assign_to__station__station_name")
-        .annotate(total_products=Count("assign_to"))
-        .filter(assign_to__isnull=False)  # Only consider allocated assets
-    )
-
-    station_names = [data["assign_to__station__station_name"]
-                     for data in stations_data]
-    total_products = [data["total_products"] for data in stations_data]
+    stats = get_dashboard_stats()
+
+    condition_data = [{'condition': condition, 'total': total}
+                      for condition, total in stats['condition'].items() if total]
+    station_names = [name for name, _ in stats['stations']]
+    total_products = [total for _, total in stats['stations']]
 
     return render(request, 'index.html', {
-        'userCount': userCount,
-        'assetCount': assetCount,
-        'availableAsset': availableAsset,
-        'inUseAsset': inUseAsset,
+        'userCount': stats['users'],
+        'assetCount': stats['assets'],
+        'availableAsset': stats['available'],
+        'inUseAsset': stats['in_use'],
         # Serialize to JSON
         'station_names': json.dumps(station_names),
         # Serialize to JSON
@@ -504,25 +414,41 @@ def update_barcode(request, asset_id):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@vary_on_headers('Accept')
+@condition(etag_func=versioned_etag(RequestAsset, AssetSubCategory, UserDetails))
 @api_view(['GET'])
 def get_requests(request):
     try:
         requests = RequestAsset.objects.all()
-        serializer = RequestAssetSerializer(requests, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(request, requests, RequestAssetSerializer, ordering='request_id')
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+def sync_changes(request):
+    """
+    Rows created, updated or deleted since the `since` cursor of a previous
+    sync. Start with since=0 and repeat with the returned cursor while
+    has_more is true.
+    """
+    try:
+        since = int(request.query_params.get('since', 0))
+    except ValueError:
+        return Response({"error": "since must be a cursor from a previous sync"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(changes_since(since), status=status.HTTP_200_OK)
+
+
+@vary_on_headers('Accept')
+@condition(etag_func=versioned_etag(Asset, UserDetails))
 @api_view(['GET'])
 def get_totals(request):
     try:
-        total_products = Asset.objects.count()
-        total_users = UserDetails.objects.count()
+        stats = get_dashboard_stats()
 
         data = {
-            "total_products": total_products,
-            "total_users": total_users,
+            "total_products": stats['assets'],
+            "total_users": stats['users'],
         }
         return Response(data, status=status.HTTP_200_OK)
     except Exception as e:
@@ -535,8 +461,7 @@ def get_user_totals(request):
     username = request.query_params.get('username', None)
     print(username)
     try:
-        total_products = Asset.objects.filter(
-            assign_to__user__username=username).count()
+        total_products = get_user_asset_count(username)
         print(total_products)
         data = {
             "total_products": total_products
@@ -547,18 +472,65 @@ def get_user_totals(request):
 
 
 @api_view(['GET'])
-def get_product_by_barcode(request, barcode):
+def search_products(request):
+    """
+    Ranked product search by name, barcode, subcategory or category.
+    Query parameters: `q`, optional `limit` and `fields`.
+    """
     try:
-        # Try to find the product with the given barcode
-        product = Asset.objects.get(barcode=barcode)
+        limit = int(request.query_params.get('limit', SEARCH_LIMIT))
+    except ValueError:
+        return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+    fields = AssetSerializer.requested_fields(request)
+    assets = search_assets(
+        request.query_params.get('q', ''), limit=limit,
+        queryset=AssetSerializer.setup_eager_loading(Asset.objects.all(), fields=fields))
+    return Response(AssetSerializer(assets, many=True, fields=fields).data, status=status.HTTP_200_OK)
 
-        serializer = AssetSerializer(product, many=False)
 
-        print(serializer.data)  # Debugging log to verify data
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    except Asset.DoesNotExist:
+@api_view(['GET'])
+def autocomplete_products(request):
+    """
+    Type-ahead for the scanner's manual entry box and the addproduct form:
+    assets whose barcode or name starts with `q`, from the in-memory index.
+    """
+    try:
+        limit = int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(autocomplete(request.query_params.get('q', ''), limit), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def get_product_by_barcode(request, barcode):
+    fields = AssetSerializer.requested_fields(request)
+    product = lookup_barcodes([barcode], fields).get(barcode)
+    if product is None:
         # If no product is found with the given barcode
         return JsonResponse({'status': 'error', 'message': 'Product not found with this barcode.'})
+    return Response(product, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def lookup_products(request):
+    """
+    Resolve many scanned barcodes at once. Body: {"barcodes": [...]}, with
+    an optional `fields` query parameter. Returns the products found, in
+    request order, and the barcodes that matched nothing.
+    """
+    barcodes = request.data.get('barcodes')
+    if not isinstance(barcodes, list) or not all(isinstance(barcode, str) for barcode in barcodes):
+        return Response({"error": "barcodes must be a list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(barcodes) > MAX_LOOKUP_BARCODES:
+        return Response({"error": f"at most {MAX_LOOKUP_BARCODES} barcodes per request"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    barcodes = list(dict.fromkeys(barcodes))
+    products = lookup_barcodes(barcodes, AssetSerializer.requested_fields(request))
+    return Response({
+        'products': [products[barcode] for barcode in barcodes if barcode in products],
+        'missing': [barcode for barcode in barcodes if barcode not in products],
+    }, status=status.HTTP_200_OK)
 
 
 def signin(request):
@@ -602,6 +574,7 @@ def forgetpassword(request):
 
 def productlist(request):
     filter = request.GET.get('filter')
+    query = request.GET.get('q', '').strip()
     print(filter)
     if filter:  # Check if a filter is provided
         # Filter assets where the assigned user's station matches the filter value
@@ -610,8 +583,10 @@ def productlist(request):
     else:
         assets = Asset.objects.all()
         # If no filter is provided, fetch all assets
+    if query:
+        assets = search_assets(query, limit=MAX_SEARCH_LIMIT, queryset=assets)
 
-    return render(request, 'productlist.html', {'asset': assets})
+    return render(request, 'productlist.html', {'asset': assets, 'q': query})
 
 
 def editproduct(request, id):
@@ -729,8 +704,7 @@ def addproduct(request):
         )
         return redirect('productlist')
 
-    categories = AssetSubCategory.objects.all()
-    return render(request, 'addproduct.html', {'categories': categories})
+    return render(request, 'addproduct.html', {'categories': get_subcategories()})
 
 
 def categorylist(request):
@@ -784,19 +758,18 @@ def addsubcategory(request):
             except AssetCategory.DoesNotExist:
                 # Handle category not found
                 return render(request, 'subaddcategory.html', {
-                    'categories': AssetCategory.objects.all(),
+                    'categories': get_category_tree(),
                     'error_message': "Selected category does not exist."
                 })
 
         else:
             # Handle empty category_id
             return render(request, 'subaddcategory.html', {
-                'categories': AssetCategory.objects.all(),
+                'categories': get_category_tree(),
                 'error_message': "Please select a category.",
             })
     else:
-        categories = AssetCategory.objects.all()
-        return render(request, 'subaddcategory.html', {'categories': categories})
+        return render(request, 'subaddcategory.html', {'categories': get_category_tree()})
 
 
 def editcategory(request):
@@ -1132,6 +1105,17 @@ def signup(request):
     return render(request, 'signup.html')
 
 
+def location_name(location):
+    """Place name for a "latitude,longitude" string, or None if it cannot be resolved."""
+    try:
+        latitude, longitude = map(float, location.split(','))
+        return format_address(reverse_geocode(latitude, longitude))
+    except (ValueError, GeocoderError) as e:
+        # The allocation is still recorded without a resolved place name
+        logger.warning("Failed to resolve location name for %r: %s", location, e)
+        return None
+
+
 @api_view(['POST'])
 def assign_product(request):
     # Deserialize the incoming data
@@ -1146,16 +1130,7 @@ def assign_product(request):
         print(location)
         print(user)
 
-        latitude, longitude = map(float, location.split(','))
-        geolocator = Nominatim(user_agent="asset_management")
-        location_name = geolocator.reverse(
-            (latitude, longitude)).raw['address']
-        print(location_name)
-        # road_name = location_name.get('road')
-        # city_name = location_name.get('state_district')
-        # district_name = location_name.get('city_district')
-        # specific_area_name = road_name + ', ' + city_name + ', ' + district_name
-        # print(specific_area_name)
+        specific_area_name = location_name(location)
 
         try:
             # Fetch the asset from the database
@@ -1168,7 +1143,7 @@ def assign_product(request):
                     asset=asset,
                     user=user,
                     expected_return_date=returnDate,
-                    # assign_location=specific_area_name
+                    assign_location=specific_area_name
                 )
 
                 asset.assign_to = user
@@ -1185,6 +1160,55 @@ def assign_product(request):
         return Response(serializer.errors, status=400)
 
 
+@api_view(['POST'])
+def assign_products(request):
+    """
+    Issue many assets to one user. Body: `barcodes`, `username`,
+    `return_date` and `location`. The location is geocoded once and the
+    assets are locked, allocated and moved to in-use together. Each barcode
+    gets a result: assigned (with its allocation id), already-assigned or
+    not-found.
+    """
+    serializer = BulkAssignSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    data = serializer.validated_data
+    try:
+        user = UserDetails.objects.get(username=data['username'])
+    except UserDetails.DoesNotExist:
+        return Response({"message": "User not found!"}, status=404)
+
+    specific_area_name = location_name(data['location'])
+    barcodes = list(dict.fromkeys(data['barcodes']))
+    with transaction.atomic():
+        assets = {
+            asset.barcode: asset for asset in Asset.objects.select_for_update().filter(
+                barcode__in=barcodes).only('asset_id', 'barcode', 'assign_to')
+        }
+        free = [asset for asset in assets.values() if asset.assign_to_id is None]
+        allocations = Allocation.objects.bulk_create([
+            Allocation(asset=asset, user=user, expected_return_date=data['return_date'],
+                       assign_location=specific_area_name)
+            for asset in free
+        ])
+        # bulk_create sends no post_save, so log the allocations for /api/sync/
+        log_changes(Allocation, [allocation.pk for allocation in allocations])
+        Asset.objects.filter(pk__in=[asset.pk for asset in free]).set_status('in-use', assign_to=user)
+
+    allocation_ids = {allocation.asset_id: allocation.pk for allocation in allocations}
+    results = []
+    for barcode in barcodes:
+        asset = assets.get(barcode)
+        if asset is None:
+            results.append({'barcode': barcode, 'status': 'not-found'})
+        elif asset.pk in allocation_ids:
+            results.append({'barcode': barcode, 'status': 'assigned',
+                            'allocation_id': allocation_ids[asset.pk]})
+        else:
+            results.append({'barcode': barcode, 'status': 'already-assigned'})
+    return Response({'assigned': len(allocations), 'results': results}, status=200)
+
+
 # import and export product
 # Function to import products
 def import_products_html(req):
@@ -1200,6 +1224,33 @@ def import_products(request):
         if not (file.name.endswith('.csv') or file.name.endswith('.xlsx')):
             return HttpResponse('Invalid file type. Please upload a CSV or Excel file.', status=400)
 
+        # Hand the file to the import workers and answer straight away;
+        # progress is polled via import-jobs.
+        if settings.IMPORT_USE_QUEUE:
+            job = enqueue_import(file)
+            if 'text/html' not in request.headers.get('Accept', ''):
+                return JsonResponse({
+                    'job_id': job.pk,
+                    'status': job.status,
+                    'status_url': reverse('import_job_status', args=[job.pk]),
+                }, status=202)
+            return render(request, 'import-products.html', {'job': job})
+
+        # Large files (or an explicit request) are read and committed in
+        # chunks so memory stays flat; progress is polled via import-jobs.
+        if request.POST.get('mode') == 'stream' or file.size > settings.IMPORT_STREAM_THRESHOLD:
+            job = ImportJob.objects.create(file_name=file.name, status='running')
+            import_stream(job, file)
+            if job.status == 'failed':
+                return HttpResponse(f'Error saving assets: {job.error}', status=500)
+            if job.rows_rejected:
+                return render(request, 'import-products.html', {'report': {
+                    'imported': job.rows_imported,
+                    'rejected': job.rejected,
+                    'rejected_count': job.rows_rejected,
+                }})
+            return redirect('productlist')
+
         try:
             # Read the file into a pandas DataFrame
             if file.name.endswith('.csv'):
@@ -1209,91 +1260,48 @@ def import_products(request):
         except Exception as e:
             return HttpResponse(f'Error reading file: {e}', status=400)
 
-        # Function to parse and validate date
-        def parse_date(date_value):
-            try:
-                if pd.isna(date_value):
-                    return None
-                if isinstance(date_value, pd.Timestamp):
-                    date_value = date_value.strftime('%Y-%m-%d')
-                return datetime.strptime(date_value, '%Y-%m-%d').date()
-            except ValueError:
-                return None
-
         try:
-            with transaction.atomic():
-                for index, row in df.iterrows():
-                    asset_name = row.get('asset_name')
-                    barcode = row.get('barcode')
-                    category_name = row.get('category_name')
-                    sub_category_name = row.get('sub_category_name')
-                    purchase_date = parse_date(row.get('purchase_date'))
-                    asset_value = row.get('asset_value')
-                    condition = row.get('condition')
-
-                    # Validate required fields
-                    if not all([asset_name, barcode, asset_value, condition]):
-                        print(f'Missing required fields in row {index}')
-                        continue
-
-                    if purchase_date is None:
-                        print(f'Invalid date format in row {index}')
-                        continue
-
-                    # Get or create the category
-                    category, _ = AssetCategory.objects.get_or_create(
-                        category_name=category_name)
-
-                    # Get or create the sub-category, linking it to the category
-                    sub_category, _ = AssetSubCategory.objects.get_or_create(
-                        sub_category_name=sub_category_name,
-                        defaults={'category': category}
-                    )
-
-                    # Create the Asset object
-                    Asset.objects.create(
-                        asset_name=asset_name,
-                        barcode=barcode,
-                        asset_category=sub_category,  # ✅ Correct foreign key reference
-                        purchase_date=purchase_date,
-                        asset_value=asset_value,
-                        condition=condition,
-                        location="",  # Set a default or get from CSV if available
-                        assign_to=None,  # Handle if user assignment is included in the CSV
-                        asset_status="available",  # Default status if not in CSV
-                    )
-
-            return redirect('productlist')
-
+            report = import_assets(df)
         except Exception as e:
             return HttpResponse(f'Error saving assets: {e}', status=500)
 
+        if report['rejected']:
+            # Show which rows were skipped instead of silently dropping them
+            report['rejected_count'] = len(report['rejected'])
+            return render(request, 'import-products.html', {'report': report})
+        return redirect('productlist')
+
     return HttpResponse('Invalid request. Please upload a CSV or Excel file.', status=400)
 
 
+@api_view(['GET'])
+def import_job_list(request):
+    jobs = ImportJob.objects.order_by('-created_at')[:20]
+    serializer = ImportJobSerializer(jobs, many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def import_job_status(request, job_id):
+    try:
+        job = ImportJob.objects.get(pk=job_id)
+    except ImportJob.DoesNotExist:
+        return Response({"error": "Import job not found"}, status=status.HTTP_404_NOT_FOUND)
+    serializer = ImportJobDetailSerializer(job)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 def export_products(request):
-    assets = Asset.objects.all()
-    response = HttpResponse(content_type='text/csv')
+    # Stream rows straight from the database cursor so memory stays flat
+    response = StreamingHttpResponse(stream_products_csv(), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="products.csv"'
+    return response
 
-    writer = csv.writer(response)
-    # Updated headers to include sub_category_name
-    writer.writerow(['asset_name', 'barcode', 'category_name', 'sub_category_name',
-                     'purchase_date', 'asset_value', 'condition'])
-
-    for asset in assets:
-        writer.writerow([
-            asset.asset_name,
-            asset.barcode,
-            asset.asset_category.category.category_name if asset.asset_category and asset.asset_category.category else '',
-            asset.asset_category.sub_category_name if asset.asset_category else '',
-            asset.purchase_date.strftime(
-                '%Y-%m-%d') if asset.purchase_date else '',
-            asset.asset_value,
-            asset.condition,
-        ])
 
-    return response
+def export_inventory_excel(request):
+    # The temporary file is removed when FileResponse closes it
+    return FileResponse(write_inventory_workbook(), as_attachment=True,
+                        filename='inventory.xlsx')
 # delete products
 
 
@@ -1325,25 +1333,12 @@ def deleteuser(request, user_id):
 def export_stock_to_excel(request, asset_id):
     try:
         asset = Asset.objects.get(asset_id=asset_id)
-        stock_data = StockHistory.objects.filter(asset=asset).order_by('date')
-
-        if not stock_data.exists():
-            return JsonResponse({"error": "No stock history available"}, status=404)
 
-        df = pd.DataFrame.from_records(
-            stock_data.values('date', 'stock_level'))
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-
-        if len(df) < 10:
-            return JsonResponse({"error": "Not enough stock history for prediction"}, status=404)
-
-        # 🔹 Train ARIMA model
-        model = ARIMA(df['stock_level'], order=(2, 1, 2))
-        model_fit = model.fit()
-        forecast = model_fit.forecast(steps=30)
-        forecast_dates = [df.index[-1] +
-                          timedelta(days=i) for i in range(1, 31)]
+        # 🔹 Reuse the cached ARIMA forecast while the history is unchanged
+        try:
+            forecast = get_forecast(asset.asset_id)
+        except ForecastError as e:
+            return JsonResponse({"error": str(e)}, status=404)
 
         # 🔹 Prepare Data for Excel
         wb = Workbook()
@@ -1354,8 +1349,8 @@ def export_stock_to_excel(request, asset_id):
         ws.append(["Date", "Predicted Stock Level"])
 
         # 🔹 Add Forecast Data
-        for date, stock in zip(forecast_dates, forecast):
-            ws.append([date.strftime('%Y-%m-%d'), int(np.round(stock))])
+        for date, stock in forecast:
+            ws.append([date.strftime('%Y-%m-%d'), stock])
 
         # 🔹 Create Response for Excel File
         response = HttpResponse(
@@ -1387,10 +1382,10 @@ def get_gemini_response(request):
         # If user selects "Database", fetch from database
         if source == "database":
             try:
-                # Use the correct field name 'asset_name'
-                products = Asset.objects.filter(
-                    asset_name__icontains=product_name)
-                if products.exists():
+                # Ranked full-text search instead of scanning asset names
+                products = search_assets(
+                    product_name, queryset=Asset.objects.select_related('asset_category'))
+                if products:
                     for product in products:
                         product_data.append({
                             "name": product.asset_name,  # Use the correct field here too
@@ -10,3 +10,14 @@ python manage.py collectstatic --no-input
 
 # Apply database migrations
 python manage.py migrate
+
+# Create the database cache tables
+python manage.py createcachetable
+
+# Refresh the offline gazetteer (data/gazetteer.csv) from the addresses
+# resolved so far
+python manage.py build_gazetteer
+
+# With IMPORT_USE_QUEUE = True, uploads wait for the import worker; run
+# `python manage.py run_import_worker` as a separate process next to the
+# web server.
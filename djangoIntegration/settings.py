@@ -53,6 +53,18 @@ REST_FRAMEWORK = {
         # Ensure anyone can access this endpoint
         'rest_framework.permissions.AllowAny',
     ],
+    # Handheld clients can ask for MessagePack with Accept: application/msgpack
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'app.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'app.renderers.MessagePackParser',
+    ],
 }
 LOGIN_URL = 'signin'
 MIDDLEWARE = [
@@ -114,6 +126,92 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Fitted stock forecasts, shared across workers and kept across restarts.
+    # Its table is created by migration app/0019_forecast_cache_table.
+    'forecasts': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'forecast_cache',
+        'TIMEOUT': 60 * 60 * 24 * 7,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+FORECAST_CACHE_ALIAS = 'forecasts'
+
+# Precomputed forecasts older than this are refitted on demand
+FORECAST_MAX_AGE_HOURS = 36
+
+
+# Reverse geocoding
+# Backends are tried in order. The offline gazetteer answers from a local
+# CSV of named places (lat, lon, road, state_district, city_district) and
+# Nominatim is only used when no place is close enough. Build the CSV with
+# `python manage.py build_gazetteer`; without it only Nominatim answers.
+
+GEOCODER_BACKENDS = [
+    {
+        'BACKEND': 'app.geocoding.GazetteerGeocoder',
+        'OPTIONS': {
+            'path': BASE_DIR / 'data' / 'gazetteer.csv',
+            'max_distance_km': 2,
+        },
+    },
+    {
+        'BACKEND': 'app.geocoding.NominatimGeocoder',
+        'OPTIONS': {
+            'user_agent': 'asset_management',
+        },
+    },
+]
+
+# Coordinates are rounded to PRECISION decimal places before the cache
+# lookup. Set to None to disable the cache.
+GEOCODER_CACHE = {
+    'precision': 4,
+    'max_entries': 10000,
+}
+
+
+# Product imports larger than this many bytes are read and committed in
+# chunks instead of being loaded into memory at once
+IMPORT_STREAM_THRESHOLD = 5 * 1024 * 1024
+
+# Set IMPORT_USE_QUEUE to True to queue uploads as ImportJobs instead of
+# importing inside the request. Queued jobs are only processed while
+# `python manage.py run_import_worker` runs next to the web server.
+IMPORT_USE_QUEUE = False
+IMPORT_UPLOAD_DIR = BASE_DIR / 'media' / 'imports'
+# Seconds before a job left running by a dead worker is picked up again
+IMPORT_JOB_TIMEOUT = 60 * 60
+# Delay before retrying a failed job, multiplied by the attempt number
+IMPORT_RETRY_DELAY = 30
+
+# Lifetime of cached dashboard statistics. Writes to assets and users
+# replace them straight away; the timeout only bounds other staleness.
+DASHBOARD_CACHE_SECONDS = 30
+
+# In-memory barcode/name index behind /api/autocomplete/. Each worker builds
+# it at startup and applies other workers' writes every REFRESH_SECONDS.
+# MAX_ENTRIES caps the keys per worker; assets beyond it are not suggested.
+AUTOCOMPLETE_MAX_ENTRIES = 1_000_000
+AUTOCOMPLETE_REFRESH_SECONDS = 10
+AUTOCOMPLETE_WARM_ON_STARTUP = True
+
+# Lifetime of serialized assets cached by barcode for the scanner lookups.
+# Any asset write starts a fresh set of cache keys.
+BARCODE_CACHE_SECONDS = 5 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoIntegration.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.AUTOCOMPLETE_WARM_ON_STARTUP:
+    from app.autocomplete import warm_index
+    warm_index()